@@ -0,0 +1,37 @@
+from igraph import Graph
+from array import array
+
+'''
+Compact, integer-indexed view of an input graph for the solvers' inner loops.
+
+Vertices are referred to by their original number (the index assigned by the graph parser), so nothing in here ever has
+to go through graph.vs.find(name) or graph.vs[x]["name"]. adjacency[v] is a tuple of the neighbors of vertex v, which is
+what the hot loops iterate, and degrees[v] is its length. The edges are also kept in their original igraph order
+(edgeSources/edgeTargets) because the connection phase of ForestWithExpansionRules walks them in that order.
+'''
+
+class CompactGraph:
+
+    def __init__(self, graph: Graph):
+        self.vcount = graph.vcount()
+        self.ecount = graph.ecount()
+
+        edgeList = graph.get_edgelist()
+        self.edgeSources = array('i', [edge[0] for edge in edgeList])
+        self.edgeTargets = array('i', [edge[1] for edge in edgeList])
+
+        # neighbors in the order their edges appear
+        neighborLists = [[] for _ in range(self.vcount)]
+        for source, target in edgeList:
+            neighborLists[source].append(target)
+            neighborLists[target].append(source)
+        self.adjacency = [tuple(neighbors) for neighbors in neighborLists]
+        self.degrees = array('i', [len(neighbors) for neighbors in neighborLists])
+
+
+# build the igraph result from a list of (u, v) edges on the original vertex numbering
+def buildTree(vcount: int, edges) -> Graph:
+    tree = Graph()
+    tree.add_vertices([str(x) for x in range(vcount)])  # keep the names so the output code can keep reading them
+    tree.add_edges(edges)
+    return tree
@@ -1,24 +1,49 @@
 from igraph import Graph
 from queue import PriorityQueue
+from SolutionAlgorithms.CompactGraph import buildTree
+from SolutionAlgorithms.PreparedGraph import PreparedGraph, prepare
+from SolutionAlgorithms.Profiling import SolverProfile
+import random
 
 # easily tricked by hard instances, so maybe don't go with this
-def solve(graph: Graph):
-    indegreeList = graph.indegree()
-    maxIndegree = max(indegreeList)
-    maxIndegreeNode = indegreeList.index(maxIndegree)  # vertices are numbered 0 to n-1, so this is valid
+# deterministic unless randomTies is set, which breaks ties between the start vertices and between equally ranked edges
+# with rng (otherwise rng is only accepted to share the solve() signature with the randomized solvers)
+# with a SolverProfile, times the search and buildTree phases (see ForestWithExpansionRules for the bigger picture)
+def solve(graph: Graph | PreparedGraph, rng: random.Random = None, profile: SolverProfile = None, randomTies: bool = False):
+    preparedGraph = prepare(graph)
+    if profile is not None:
+        profile.startPhase('search')
+    indegreeList = preparedGraph.degrees
+    maxIndegree = preparedGraph.maxDegree
+    maxIndegreeNode = preparedGraph.verticesByDegree[maxIndegree][0]  # lowest numbered vertex of maximum degree
+    if randomTies:
+        rng = rng if rng is not None else random
+        maxIndegreeNode = rng.choice(preparedGraph.verticesByDegree[maxIndegree])
 
-    spanningTree = Graph()
-    spanningTree.add_vertices(range(graph.vcount()))
+    treeEdges = []
     searchQueue = PriorityQueue()
-    searchQueue.put((-1 * maxIndegree, (-1, maxIndegreeNode))) # PriorityQueue uses min-heap, so we must flip the sign of the priority
+    searchQueue.put((-1 * maxIndegree, 0, (-1, maxIndegreeNode))) # PriorityQueue uses min-heap, so we must flip the sign of the priority
     discoveredNodes = set([maxIndegreeNode])
     while not searchQueue.empty():
-        currentEdge = searchQueue.get()[1]
+        currentEdge = searchQueue.get()[2]
         if currentEdge[0] != -1:  # don't add an edge for the first vertex because its a start vertex with no edge
-            spanningTree.add_edge(currentEdge[0], currentEdge[1])
-        for neighbor in graph.neighbors(currentEdge[1]):
+            treeEdges.append((currentEdge[0], currentEdge[1]))
+        for neighbor in preparedGraph.adjacency[currentEdge[1]]:
             if neighbor not in discoveredNodes:
-                searchQueue.put((-1 * indegreeList[currentEdge[1]], (currentEdge[1], neighbor)))
+                # a random second key breaks ties instead of the edge itself, which favors low vertex numbers
+                tieBreaker = rng.random() if randomTies else 0
+                searchQueue.put((-1 * indegreeList[currentEdge[1]], tieBreaker, (currentEdge[1], neighbor)))
                 discoveredNodes.add(neighbor)
 
-    return spanningTree, len([indegree for indegree in spanningTree.indegree() if indegree == 1])
+    treeDegree = [0] * preparedGraph.vcount
+    for source, target in treeEdges:
+        treeDegree[source] += 1
+        treeDegree[target] += 1
+    if profile is not None:
+        profile.endPhase()
+        profile.count('treesBuilt')
+        profile.startPhase('buildTree')
+    tree = buildTree(preparedGraph.vcount, treeEdges)
+    if profile is not None:
+        profile.endPhase()
+    return tree, len([degree for degree in treeDegree if degree == 1])
@@ -0,0 +1,41 @@
+'''
+Disjoint-set forest (union by rank with path compression) over the vertices 0 to n-1.
+
+This is the Kruskal-style structure that the connection phase of ForestWithExpansionRules used to fake with a list of
+sets and a linear findSetIndex scan.
+'''
+
+class DisjointSet:
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+        self.rank = [0] * size
+        self.numSets = size
+
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        root = item
+        while parent[root] != root:
+            root = parent[root]
+        
+        # path compression: point everything on the way up straight at the root
+        while parent[item] != root:
+            parent[item], item = root, parent[item]
+        return root
+
+
+    # merge the sets containing a and b, returning False if they were already in the same set
+    def union(self, a: int, b: int) -> bool:
+        rootA = self.find(a)
+        rootB = self.find(b)
+        if rootA == rootB:
+            return False
+
+        if self.rank[rootA] < self.rank[rootB]:
+            rootA, rootB = rootB, rootA
+        self.parent[rootB] = rootA
+        if self.rank[rootA] == self.rank[rootB]:
+            self.rank[rootA] += 1
+        self.numSets -= 1
+        return True
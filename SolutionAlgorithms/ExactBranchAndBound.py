@@ -0,0 +1,177 @@
+from igraph import Graph
+from SolutionAlgorithms.LeafBounds import upperBoundLeaves
+from SolutionAlgorithms.PreparedGraph import PreparedGraph, prepare
+import math
+import time
+
+'''
+Exact solver for small instances, through the dual problem: for n >= 3 the interior vertices of a spanning tree form a
+connected dominating set (CDS), and any CDS D gives a spanning tree with at least n - |D| leaves (a spanning tree of D
+with every other vertex hung on a neighbor in D). So the maximum number of leaves is n minus the size of a minimum CDS.
+
+The search is a depth-first branch and bound over connected vertex sets, with the vertex sets held as int bitmasks:
+    - a set D is grown one frontier vertex (a neighbor of D that is not excluded) at a time, branching on including the
+      vertex or excluding it for the rest of the subtree, so every connected set is reached exactly once
+    - the search starts from a cut vertex if there is one (cut vertices are in every CDS); otherwise it branches over the
+      closed neighborhood of a minimum degree vertex, since one of those vertices has to be in D
+    - a node is pruned when some undominated vertex has no dominator left, or when |D| plus a lower bound on the vertices
+      still needed (the cut vertices not in D, and the undominated vertices divided by the most any one vertex can still
+      dominate) cannot beat the incumbent
+The incumbent is the interior of the best heuristic tree, so the search only has to look for strictly smaller sets. If
+the time limit runs out, the incumbent is returned without a proof, and the gap to the cheap upper bound from LeafBounds
+is what is left to close.
+'''
+
+class SearchTimeout(Exception):
+    pass
+
+
+class ConnectedDominatingSetSearch:
+
+    def __init__(self, graph: PreparedGraph, incumbentSet: int, deadline: float = None):
+        self.graph = graph
+        numVertices = graph.vcount
+        self.allVertices = (1 << numVertices) - 1
+        self.openNeighborhoods = [0] * numVertices
+        for v in range(numVertices):
+            for neighbor in graph.adjacency[v]:
+                self.openNeighborhoods[v] |= 1 << neighbor
+        self.closedNeighborhoods = [self.openNeighborhoods[v] | (1 << v) for v in range(numVertices)]
+        self.requiredSet = 0
+        for v in graph.cutVertices:
+            self.requiredSet |= 1 << v
+
+        self.bestSet = incumbentSet
+        self.bestSize = incumbentSet.bit_count()
+        self.deadline = deadline
+        self.nodesVisited = 0
+
+
+    def run(self):
+        if self.requiredSet:
+            root = (self.requiredSet & -self.requiredSet).bit_length() - 1
+            self.search(1 << root, self.closedNeighborhoods[root], 0)
+            return
+
+        # some vertex of the closed neighborhood of a minimum degree vertex must be in the set
+        minDegreeVertex = min(range(self.graph.vcount), key=lambda v: self.graph.degrees[v])
+        excluded = 0
+        for root in sorted(self.graph.adjacency[minDegreeVertex] + (minDegreeVertex,),
+                           key=lambda v: -self.graph.degrees[v]):
+            self.search(1 << root, self.closedNeighborhoods[root], excluded)
+            excluded |= 1 << root
+
+
+    def search(self, chosen: int, dominated: int, excluded: int):
+        self.nodesVisited += 1
+        if self.deadline is not None and self.nodesVisited % 1024 == 0 and time.time() >= self.deadline:
+            raise SearchTimeout()
+
+        chosenSize = chosen.bit_count()
+        undominated = self.allVertices & ~dominated
+        if not undominated:
+            if chosenSize < self.bestSize:
+                self.bestSet, self.bestSize = chosen, chosenSize
+            return
+        if chosenSize + 1 >= self.bestSize:
+            return
+
+        # every undominated vertex still needs a dominator that isn't excluded
+        available = self.allVertices & ~excluded & ~chosen
+        maxCover = 0
+        for v in iterateBits(available):
+            maxCover = max(maxCover, (self.closedNeighborhoods[v] & undominated).bit_count())
+        remaining = undominated
+        while remaining:
+            lowest = remaining & -remaining
+            if not self.closedNeighborhoods[lowest.bit_length() - 1] & ~excluded:
+                return
+            remaining ^= lowest
+        if maxCover == 0:
+            return
+        stillNeeded = max((self.requiredSet & ~chosen).bit_count(), math.ceil(undominated.bit_count() / maxCover))
+        if chosenSize + stillNeeded >= self.bestSize:
+            return
+
+        frontier = 0
+        for v in iterateBits(chosen):
+            frontier |= self.openNeighborhoods[v]
+        frontier &= available
+        if not frontier:
+            return
+
+        # branch on the frontier vertex that dominates the most new vertices, required vertices first
+        branchVertex = max(iterateBits(frontier),
+                           key=lambda v: ((self.requiredSet >> v) & 1, (self.closedNeighborhoods[v] & undominated).bit_count()))
+        self.search(chosen | (1 << branchVertex), dominated | self.closedNeighborhoods[branchVertex], excluded)
+        if not (self.requiredSet >> branchVertex) & 1:
+            self.search(chosen, dominated, excluded | (1 << branchVertex))
+
+
+def iterateBits(mask: int):
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+# spanning tree whose interior is (a subset of) the connected dominating set, as a list of (u, v) edges
+def treeFromDominatingSet(graph: PreparedGraph, dominatingSet: int):
+    members = list(iterateBits(dominatingSet))
+    inTree = bytearray(graph.vcount)
+    treeEdges = []
+    stack = [members[0]]
+    inTree[members[0]] = 1
+    while stack:
+        v = stack.pop()
+        for neighbor in graph.adjacency[v]:
+            if (dominatingSet >> neighbor) & 1 and not inTree[neighbor]:
+                inTree[neighbor] = 1
+                treeEdges.append((v, neighbor))
+                stack.append(neighbor)
+    for v in range(graph.vcount):
+        if not inTree[v]:
+            dominator = next(neighbor for neighbor in graph.adjacency[v] if (dominatingSet >> neighbor) & 1)
+            treeEdges.append((dominator, v))
+    return treeEdges
+
+
+def countLeaves(numVertices: int, treeEdges) -> int:
+    degrees = [0] * numVertices
+    for source, target in treeEdges:
+        degrees[source] += 1
+        degrees[target] += 1
+    return degrees.count(1)
+
+
+'''
+Search for a maximum leaf spanning tree, starting from the incumbent tree given as a list of (u, v) edges. Returns
+(edges of the best tree, its leaves, whether it is proven optimal, search nodes visited).
+'''
+def solve(graph: Graph | PreparedGraph, incumbentEdges, timeLimit: float = None):
+    graph = prepare(graph)
+    numVertices = graph.vcount
+    incumbentLeaves = countLeaves(numVertices, incumbentEdges)
+    if numVertices < 3 or incumbentLeaves >= upperBoundLeaves(graph):
+        return incumbentEdges, incumbentLeaves, True, 0
+
+    degrees = [0] * numVertices
+    for source, target in incumbentEdges:
+        degrees[source] += 1
+        degrees[target] += 1
+    incumbentSet = 0
+    for v in range(numVertices):
+        if degrees[v] > 1:
+            incumbentSet |= 1 << v
+
+    search = ConnectedDominatingSetSearch(graph, incumbentSet, time.time() + timeLimit if timeLimit is not None else None)
+    provedOptimal = True
+    try:
+        search.run()
+    except SearchTimeout:
+        provedOptimal = False
+
+    if search.bestSet == incumbentSet:
+        return incumbentEdges, incumbentLeaves, provedOptimal, search.nodesVisited
+    treeEdges = treeFromDominatingSet(graph, search.bestSet)
+    return treeEdges, countLeaves(numVertices, treeEdges), provedOptimal, search.nodesVisited
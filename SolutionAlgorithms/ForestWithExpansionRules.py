@@ -1,4 +1,10 @@
 from igraph import Graph
+from SolutionAlgorithms.CompactGraph import CompactGraph, buildTree
+from SolutionAlgorithms.PreparedGraph import PreparedGraph, prepare
+from SolutionAlgorithms.DisjointSet import DisjointSet
+from SolutionAlgorithms.Profiling import SolverProfile
+from collections import deque
+import heapq
 import random
 
 '''
@@ -10,159 +16,311 @@ leaves as possible on the trees being connected.
 
 Full code is available at https://github.com/jdurrell/Max-leaf-Spanning-Tree
 
-Note: from the igraph library, we use graph.vs.[node_index]["name"] to get the "name" of the vertex instead of using its index
-        in the graph. This is because we end up deleting vertices from the working copy of the graph in order to make the 
-        computation easier, but this changes the indices of those vertices, so working with names is more consistent.
+Note: the solver works on a CompactGraph (adjacency tuples indexed by the original vertex numbers) instead of the igraph
+        object. Rather than deleting each finished tree from a working copy of the graph, it keeps two masks over the
+        original numbering: inTree marks the vertices of the tree currently being grown, and deleted marks the vertices of
+        trees that are already finished (which is what graphInProcess.delete_vertices used to do). A vertex is a "new"
+        neighbor if it is in neither mask. Only the final result is built as an igraph Graph.
+        The graph can be passed in already prepared (see PreparedGraph) so that repeated attempts on it share that work.
 
-        We then get the vertex index from the name using graph.vs.find(name). Although it's supposed to be able to use the 
-        name property as an index, the names are constructed in the graph parser as strings from the original numbering of
-        the vertices, and I don't trust Python developers or Python's typing system to not pull a Javascript on me and just 
-        treat the string version of a number as an actual integer value instead of a string.
+Variants: minRootDegree is the smallest number of new neighbors a root needs for a new tree to be grown from it (3 by
+default, see below), randomTies breaks ties between equally ranked expandable leaves with rng instead of taking the
+one that became expandable first, and rankBranchExpansions ranks rule 2 expansions by the leaf's new neighbor count
+(see ExpansionFrontier). portfolioScheduler.ARMS runs these as separate arms.
+
+Profiling: pass a SolverProfile as profile to time the phases (rootSearch, treeGrowth, connection, buildTree) and count
+treesBuilt, rootScans (full scans for the next root), lookaheadExpansions and branchExpansions (rule 1 and rule 2 of the
+ExpansionFrontier), frontierPushes, forestComponents (trees and floating vertices left for the connection phase),
+connectionPasses, forcedLeafConnections and leavesLost. Without a profile none of this is done.
 '''
 
-def solve(graph: Graph):
-    graphInProcess: Graph = graph.copy()  # copy graph so that we can delete from it without altering the original input
-    spanningTree = Graph()
-    spanningTree.add_vertices([str(x) for x in range(graph.vcount())])
-    treeSets = [] # list of sets representing each tree in the forest (connected components)
+def solve(graph: Graph | PreparedGraph, rng: random.Random = random, profile: SolverProfile = None,
+          minRootDegree: int = 3, randomTies: bool = False, rankBranchExpansions: bool = False):
+    compactGraph = prepare(graph)
+    numVertices = compactGraph.vcount
+    adjacency = compactGraph.adjacency
+    inTree = bytearray(numVertices)
+    deleted = bytearray(numVertices)
+    newNeighborCount = list(compactGraph.degrees)  # number of neighbors of each vertex that are neither inTree nor deleted
+    treeEdges = []
+    treeDegree = [0] * numVertices
+    components = DisjointSet(numVertices)  # connected components of the forest being built
 
 
     # build a new tree in the forest while the graph has a node that is reasonable to expand
     # nodes of degree <= 2 are less useful for expansion roots because they often end up as leaves when upon connecting components
-    while graphInProcess.maxdegree() >= 3:
+    while True:
+        if profile is not None:
+            profile.startPhase('rootSearch')
         # find a random node with the maximum degree (likely a best one to use as the root for this tree)
         # randomness is used because this algorithm is repeated multiple times to find a potentially better solution
-        maxDegree = -1
-        maxDegreeNodes = []
-        for node in graphInProcess.vs:
-            degree = graphInProcess.degree(node)
-            if degree == maxDegree:
-                maxDegreeNodes.append(node)
-            elif degree > maxDegree:
-                maxDegree = degree
-                maxDegreeNodes = [node]
-        maxDegreeNode = random.choice(maxDegreeNodes)
+        # (pass a seeded random.Random as rng to make an attempt reproducible)
+        # between trees nothing is inTree, so the new neighbor count is exactly the degree in the remaining graph
+        # (before the first tree that is just the degree, so the candidates come straight from the prepared graph)
+        if components.numSets == numVertices:
+            maxDegree = compactGraph.maxDegree
+            maxDegreeNodes = compactGraph.verticesByDegree[maxDegree]
+        else:
+            if profile is not None:
+                profile.count('rootScans')
+            maxDegree = -1
+            maxDegreeNodes = []
+            for node in range(numVertices):
+                if deleted[node]:
+                    continue
+                degree = newNeighborCount[node]
+                if degree == maxDegree:
+                    maxDegreeNodes.append(node)
+                elif degree > maxDegree:
+                    maxDegree = degree
+                    maxDegreeNodes = [node]
+        if profile is not None:
+            profile.endPhase()
+        if maxDegree < minRootDegree:
+            break
+        maxDegreeNode = rng.choice(maxDegreeNodes)
+        if profile is not None:
+            profile.startPhase('treeGrowth')
 
         # build a new tree in the forest
-        nodeNames = [graphInProcess.vs[node]["name"] for node in graphInProcess.neighbors(maxDegreeNode)]
-        leaves = set(nodeNames)
-        nodeNames.append(maxDegreeNode["name"])
-        spanningTree.add_edges([(maxDegreeNode["name"], name) for name in nodeNames if name != maxDegreeNode["name"]])
-        nodesInTree = set(nodeNames)  # for faster lookup time
+        frontier = ExpansionFrontier(compactGraph, inTree, deleted, newNeighborCount, rng if randomTies else None,
+                                     rankBranchExpansions)
+        frontier.addToTree(maxDegreeNode, False)
+        for neighbor in [x for x in adjacency[maxDegreeNode] if not inTree[x] and not deleted[x]]:
+            addTreeEdge(treeEdges, treeDegree, maxDegreeNode, neighbor)
+            frontier.addToTree(neighbor, True)
+        frontier.refresh()
         
         # expand the tree while it has an expandable leaf
-        expandingNodeTuple = getExpandableNode(graphInProcess, nodesInTree, leaves)
-        while expandingNodeTuple is not None:
-            leafNodeName: str = expandingNodeTuple[0]
-            leaves.remove(leafNodeName)
-            nonTreeNeighbors: list[str] = [graphInProcess.vs[x]["name"] for x in graphInProcess.neighbors(graphInProcess.vs.find(leafNodeName)) if graphInProcess.vs[x]["name"] not in nodesInTree]
+        leafNode = frontier.popExpandableNode()
+        while leafNode is not None:
+            nonTreeNeighbors = [x for x in adjacency[leafNode] if not inTree[x] and not deleted[x]]
             
             # if the expansion node has just one new neighbor, then it's the higher-priority expansion type
             # expand the tree to this node, then expand it to all of that neighbor's neighbors (with the neighbor as the parent)
             if len(nonTreeNeighbors) == 1:
-                neighborName: str = nonTreeNeighbors[0]
-                spanningTree.add_edge(spanningTree.vs.find(leafNodeName), spanningTree.vs.find(neighborName))
-                nodesInTree.add(neighborName)
-                for extendedNeighbor in graphInProcess.neighbors(graphInProcess.vs.find(neighborName)):
-                    extendedNeighborName = graphInProcess.vs[extendedNeighbor]["name"]
-                    if extendedNeighborName not in nodesInTree:
-                        nodesInTree.add(extendedNeighborName)
-                        leaves.add(extendedNeighborName)
-                        spanningTree.add_edge(spanningTree.vs.find(neighborName), spanningTree.vs.find(extendedNeighborName))
+                if profile is not None:
+                    profile.count('lookaheadExpansions')
+                neighbor = nonTreeNeighbors[0]
+                addTreeEdge(treeEdges, treeDegree, leafNode, neighbor)
+                frontier.addToTree(neighbor, False)
+                for extendedNeighbor in [x for x in adjacency[neighbor] if not inTree[x] and not deleted[x]]:
+                    addTreeEdge(treeEdges, treeDegree, neighbor, extendedNeighbor)
+                    frontier.addToTree(extendedNeighbor, True)
             
             # if the expansion node has more than two new neighbors, add all of them to the tree as children of this node
             else:
-                for neighborName in nonTreeNeighbors:
-                    nodesInTree.add(neighborName)
-                    leaves.add(neighborName)
-                    spanningTree.add_edge(spanningTree.vs.find(leafNodeName), spanningTree.vs.find(neighborName))
+                if profile is not None:
+                    profile.count('branchExpansions')
+                for neighbor in nonTreeNeighbors:
+                    addTreeEdge(treeEdges, treeDegree, leafNode, neighbor)
+                    frontier.addToTree(neighbor, True)
             
-            expandingNodeTuple = getExpandableNode(graphInProcess, nodesInTree, leaves)
+            frontier.refresh()
+            leafNode = frontier.popExpandableNode()
         
-        # now remove the constructed tree from the original graph and update the list of connected components (trees)
-        graphInProcess.delete_vertices(list(nodesInTree))
-        treeSets.append(nodesInTree)
+        # now remove the constructed tree from the working graph and update the list of connected components (trees)
+        # the new neighbor counts already exclude these vertices, so they carry over unchanged as remaining degrees
+        for node in frontier.nodesInTree:
+            inTree[node] = 0
+            deleted[node] = 1
+            components.union(maxDegreeNode, node)
+        if profile is not None:
+            profile.count('treesBuilt')
+            profile.count('frontierPushes', frontier.sequence)
+            profile.endPhase()
 
     # now connect the components similarly to Kruskal's Algorithm
-    while (spanningTree.ecount() < graph.vcount() - 1) or (len(treeSets) > 1):  # maybe only first clause is necessary?
-        # skip building connections on leaf nodes to maintain maximum leafyness unless we do an entire pass without adding an edge
-        addedEdge = connectionEdgePass(graph, spanningTree, treeSets, False)
-        if not addedEdge:
-            # if failed to add an edge the first time, then we are forced to connect on at least one leaf node
-            connectionEdgePass(graph, spanningTree, treeSets, True)
-
-    return spanningTree, len([degree for degree in spanningTree.indegree() if degree == 1])
-
-
-# iterate through all of the edges in the original graph to connect the individual trees (and floating nodes) in the building spanning tree 
-def connectionEdgePass(graph: Graph, tree: Graph, treeSets, useLeaves: bool):
-    addedEdge = False
-    for edge in graph.es:
-        source = graph.vs[edge.source]["name"]
-        target = graph.vs[edge.target]["name"]
-        setIndexSource = findSetIndex(treeSets, source)
-        setIndexTarget = findSetIndex(treeSets, target)
-        
-        # skip connecting on leaves when useLeaves is True (maintain more leaves when we can connect using branches instead)
-        if not useLeaves and (tree.degree(graph.vs.find(source)) == 1 or tree.degree(graph.vs.find(target)) == 1):
-            continue
+    # skip building connections on leaf nodes to maintain maximum leafyness unless no other connection is possible
+    if profile is not None:
+        profile.count('forestComponents', components.numSets)
+        profile.startPhase('connection')
+    forcedConnections, leavesLost, connectionPasses = connectComponents(compactGraph, treeEdges, treeDegree, components)
+    if profile is not None:
+        profile.endPhase()
+        profile.count('connectionPasses', connectionPasses)
+        profile.count('forcedLeafConnections', forcedConnections)
+        profile.count('leavesLost', leavesLost)
+        profile.startPhase('buildTree')
 
-        # if endpoints are from different connected components, add the edge to the spanning tree and connect the components
-        if setIndexSource is None and setIndexTarget is None:
-            tree.add_edge(tree.vs.find(source), tree.vs.find(target))
-            addedEdge = True
-            treeSets.append(set([source, target]))
-        elif setIndexSource != setIndexTarget:
-            tree.add_edge(tree.vs.find(source), tree.vs.find(target))
-            addedEdge = True
-            if setIndexSource is None:
-                treeSets[setIndexTarget].add(source)
-            elif setIndexTarget is None:
-                treeSets[setIndexSource].add(target)
-            else:
-                treeSets[setIndexSource] = treeSets[setIndexSource].union(treeSets[setIndexTarget])
-                treeSets.pop(setIndexTarget)
-    
-    # return whether a connection was made during this pass
-    return addedEdge
-
-# TODO: implement these as trees like in Kruskal's Algorithm for better speed
-# find the set in the list where the given item appears
-def findSetIndex(setList, item):
-    for i in range(len(setList)):
-        if item in setList[i]:
-            return i
-    
-    # return None if item does not appear in any set
-    return None
-
-
-# get the next node to expand in the tree according to the priority of the expansion rules
-def getExpandableNode(graph: Graph, nodesInTree: set, leaves: set):
-    leafPriorityDegree = (None, 999, -1)  # (node to expand, priority of expansion type, degree of node)
-    for leaf in leaves:
-        nonTreeNeighbors = [graph.vs[x]["name"] for x in graph.neighbors(graph.vs.find(leaf)) if graph.vs[x]["name"] not in nodesInTree]
-        
-        # in the case where the leaf node has only one new neighbor, it's possible that this neighbor has many more new neighbors
-        # this is essentially a one-step lookahead to find a node that might yield more total numbers of leaves
-        if len(nonTreeNeighbors) == 1:
-            nonTreeNeighborsOfNeighbor = [graph.vs[x]["name"] for x in graph.neighbors(graph.vs.find(nonTreeNeighbors[0])) if graph.vs[x]["name"] not in nodesInTree]
-            if len(nonTreeNeighborsOfNeighbor) >= 2 and (1 < leafPriorityDegree[1] or len(nonTreeNeighborsOfNeighbor) > leafPriorityDegree[2]):
-                # this expansion type is a higher piority than the other one because it comes from the lookahead
-                leafPriorityDegree = (leaf, 1, len(nonTreeNeighborsOfNeighbor))
-        
-        # case where the leaf node has more then two new neighbors is still useful, but lower priority.
-        elif len(nonTreeNeighbors) >= 2:
-            # skip this expansion if we've already found an expansion of higher priority
-            if leafPriorityDegree[1] < 2:
-                continue
-            # this expansion type has a lower priority because these nodes would end up being leaves *anyways*,
-            # even on the lookahead expansion, so this allows to possibly save some number of leaves by using
-            # a node found by the lookahead if one exists
-            leafPriorityDegree = (leaf, 2, len(nonTreeNeighbors))
-    
-    # return None if there are no more expandable leaves on the tree
-    if leafPriorityDegree[0] is not None:
-        return leafPriorityDegree
-    else: 
+    tree = buildTree(numVertices, treeEdges)
+    if profile is not None:
+        profile.endPhase()
+    return tree, len([degree for degree in treeDegree if degree == 1])
+
+
+'''
+Priority queue of the leaves of the tree being grown, keyed on (expansion rule, rank within the rule) so that the next
+expansion can be popped instead of rescanning every leaf after each step. The rules are the ones the old full scan used:
+    rule 1: the leaf has exactly one new neighbor, and that neighbor has at least two new neighbors (lookahead expansion),
+            ranked by the new neighbor count of that neighbor
+    rule 2: the leaf has at least two new neighbors; these all rank the same, as they did in the old scan, unless
+            rankBranchExpansions is set, which ranks them by the leaf's own new neighbor count
+Entries are invalidated lazily: when a vertex joins the tree, only the keys of its neighbors and of the leaves hanging off
+those neighbors can change, so refresh() pushes fresh entries for just those leaves and popExpandableNode() throws away
+any entry whose key no longer matches. Ties go to the entry pushed first, or to a random one if tieRng is given.
+'''
+class ExpansionFrontier:
+
+    def __init__(self, graph: CompactGraph, inTree: bytearray, deleted: bytearray, newNeighborCount: list,
+                 tieRng: random.Random = None, rankBranchExpansions: bool = False):
+        self.adjacency = graph.adjacency
+        self.inTree = inTree
+        self.deleted = deleted
+        self.newNeighborCount = newNeighborCount
+        self.nodesInTree = []
+        self.leaves = set()
+        self.heap = []
+        self.sequence = 0  # breaks ties in favor of the entry pushed first
+        self.tieRng = tieRng
+        self.rankBranchExpansions = rankBranchExpansions
+        self.joinedNodes = []  # vertices that joined the tree since the last refresh
+        self.newLeaves = []
+        self.lookaheadLeaves = {}  # new vertex -> leaves whose only new neighbor it is (may hold stale leaves)
+
+
+    def addToTree(self, node: int, isLeaf: bool):
+        self.inTree[node] = 1
+        self.nodesInTree.append(node)
+        for neighbor in self.adjacency[node]:
+            self.newNeighborCount[neighbor] -= 1
+        self.joinedNodes.append(node)
+        if isLeaf:
+            self.leaves.add(node)
+            self.newLeaves.append(node)
+
+
+    # push updated entries for every leaf whose key may have changed since the last refresh
+    def refresh(self):
+        inTree = self.inTree
+        deleted = self.deleted
+        leaves = self.leaves
+        lookaheadLeaves = self.lookaheadLeaves
+        affectedLeaves = set(self.newLeaves)
+        for node in self.joinedNodes:
+            for neighbor in self.adjacency[node]:
+                if neighbor in leaves:
+                    affectedLeaves.add(neighbor)
+                elif neighbor in lookaheadLeaves and not inTree[neighbor] and not deleted[neighbor]:
+                    # leaves whose only new neighbor is this one use its count for their lookahead key
+                    affectedLeaves.update(lookaheadLeaves[neighbor])
+        self.joinedNodes = []
+        self.newLeaves = []
+
+        for leaf in affectedLeaves:
+            key = self.expansionKey(leaf)
+            if key is not None:
+                tieBreaker = self.tieRng.random() if self.tieRng is not None else self.sequence
+                heapq.heappush(self.heap, (key[0], -key[1], tieBreaker, leaf))
+                self.sequence += 1
+
+
+    # remove and return the best expandable leaf, or None if no leaf can be expanded
+    def popExpandableNode(self):
+        while self.heap:
+            priority, negativeCount, _, leaf = heapq.heappop(self.heap)
+            if self.expansionKey(leaf) == (priority, -negativeCount):
+                self.leaves.remove(leaf)
+                return leaf
+        return None
+
+
+    # (priority of expansion type, rank within it) for a leaf, or None if it is not expandable
+    def expansionKey(self, leaf: int):
+        if leaf not in self.leaves:
+            return None
+        numNewNeighbors = self.newNeighborCount[leaf]
+        if numNewNeighbors == 1:
+            for neighbor in self.adjacency[leaf]:
+                if not self.inTree[neighbor] and not self.deleted[neighbor]:
+                    # remember the dependency so that refresh() can find this leaf when the neighbor's count changes
+                    self.lookaheadLeaves.setdefault(neighbor, set()).add(leaf)
+                    if self.newNeighborCount[neighbor] >= 2:
+                        return (1, self.newNeighborCount[neighbor])
+                    return None
+        elif numNewNeighbors >= 2:
+            return (2, numNewNeighbors if self.rankBranchExpansions else 0)
         return None
+
+
+def addTreeEdge(treeEdges: list, treeDegree: list, source: int, target: int):
+    treeEdges.append((source, target))
+    treeDegree[source] += 1
+    treeDegree[target] += 1
+
+
+'''
+Connect the trees of the forest (and any floating vertices) into a single spanning tree, Kruskal-style, with a
+DisjointSet tracking the components. Edges are handled in tiers instead of repeated sweeps over every edge:
+    branch-branch tier: neither endpoint is currently a leaf (floating vertices count, since they have no tree edges yet),
+                        so the edge can be added without costing a leaf
+    leaf tier: at least one endpoint is a leaf. These are only used when the branch-branch tier is empty, one at a time,
+               preferring edges that touch one leaf over edges that touch two
+A leaf tier edge is parked under its leaf endpoints. Once a forced connection turns one of them into a branch, the
+parked edges move back to the branch-branch tier. Tree degrees only grow, so a vertex is a leaf for at most one
+stretch. Each edge is therefore handled a constant number of times, and edges inside one component are dropped for good.
+Returns (number of forced leaf connections, number of leaves lost to them, number of passes over the branch-branch tier).
+'''
+def connectComponents(graph: PreparedGraph, treeEdges: list, treeDegree: list, components: DisjointSet):
+    branchTier = deque(zip(graph.edgeSources, graph.edgeTargets))
+    leafTiers = ([], [])  # edges touching one leaf, edges touching two leaves
+    parkedEdges = {}  # leaf -> edges that were skipped because of it
+    forcedConnections = 0
+    leavesLost = 0
+    connectionPasses = 0
+
+    while components.numSets > 1:
+        connectionPasses += 1
+        # add every edge that can be added without connecting on a leaf
+        while branchTier:
+            source, target = branchTier.popleft()
+            if components.find(source) == components.find(target):
+                continue
+            if treeDegree[source] == 1 or treeDegree[target] == 1:
+                parkEdge(parkedEdges, leafTiers, treeDegree, source, target)
+                continue
+            components.union(source, target)
+            addTreeEdge(treeEdges, treeDegree, source, target)
+
+        if components.numSets == 1:
+            break
+
+        # forced to connect on at least one leaf node: use the cheapest leaf tier edge that still joins two components
+        source, target = popLeafEdge(leafTiers, treeDegree, components)
+        leavesLost += (treeDegree[source] == 1) + (treeDegree[target] == 1)
+        forcedConnections += 1
+        components.union(source, target)
+        addTreeEdge(treeEdges, treeDegree, source, target)
+        for endpoint in (source, target):
+            if treeDegree[endpoint] == 2 and endpoint in parkedEdges:
+                branchTier.extend(parkedEdges.pop(endpoint))
+
+    return forcedConnections, leavesLost, connectionPasses
+
+
+def parkEdge(parkedEdges: dict, leafTiers: tuple, treeDegree: list, source: int, target: int):
+    numLeafEndpoints = 0
+    for endpoint in (source, target):
+        if treeDegree[endpoint] == 1:
+            parkedEdges.setdefault(endpoint, []).append((source, target))
+            numLeafEndpoints += 1
+    leafTiers[numLeafEndpoints - 1].append((source, target))
+
+
+def popLeafEdge(leafTiers: tuple, treeDegree: list, components: DisjointSet):
+    while True:
+        if leafTiers[0]:
+            source, target = leafTiers[0].pop()
+        else:
+            source, target = leafTiers[1].pop()  # the graph is connected, so some edge must be left while components remain
+        if components.find(source) == components.find(target):
+            continue
+
+        # the endpoints may have changed since the edge was parked (a floating vertex can become a leaf)
+        numLeafEndpoints = (treeDegree[source] == 1) + (treeDegree[target] == 1)
+        if numLeafEndpoints == 2 and not leafTiers[0]:
+            return source, target
+        elif numLeafEndpoints == 2:
+            leafTiers[1].append((source, target))
+        else:
+            return source, target
@@ -0,0 +1,113 @@
+from igraph import Graph
+
+'''
+Reduction rules that shrink an input graph to a kernel before the heuristics run, and the lifting of a kernel spanning tree
+back to a spanning tree of the original graph. Both rules are exact: a kernel tree with L leaves lifts to a tree with
+L + leafOffset leaves, so an optimal kernel tree lifts to an optimal tree.
+
+    pendant rule: if a vertex p has several degree-1 neighbors, keep one of them and remove the rest. The kept one forces p
+                  to be interior in every spanning tree of the kernel (as long as the kernel has at least 3 vertices), so
+                  each removed neighbor is exactly one extra leaf, hung back on p when lifting.
+    chain rule: a path a - u1 - u2 - ... - uk - b of k >= 3 degree-2 vertices between vertices a and b of degree >= 3
+                (a and b may be the same vertex) is shortened to a - u1 - uk - b by removing u2 ... u(k-1) and adding the
+                edge (u1, uk). A spanning tree drops at most one edge of such a path, and the leaves it gains from the path
+                only depend on whether it drops an end edge, a middle edge, or nothing, which the shortened path can still
+                express. When lifting, a kernel tree using (u1, uk) becomes the whole path, and one without it (so it drops
+                an end edge instead) becomes the path minus the middle edge (u1, u2), which again leaves u1 and u2 as leaves.
+
+Bridges are also in every spanning tree, but contracting them would need solvers that can tell a vertex whose leafyness
+does not count, so they are left alone here.
+'''
+
+class Kernel:
+
+    def __init__(self, graph: Graph):
+        numVertices = graph.vcount()
+        adjacency = [set() for _ in range(numVertices)]
+        for source, target in graph.get_edgelist():
+            adjacency[source].add(target)
+            adjacency[target].add(source)
+        removed = bytearray(numVertices)
+        self.removedPendants = []  # (forced parent, removed degree-1 vertex)
+        self.chains = []  # (u1, u2, ..., uk) for each shortened chain
+
+        # pendant rule, skipped if it would leave fewer than 3 vertices (where the kept neighbor no longer forces anything)
+        pendants = []
+        for parent in range(numVertices):
+            degreeOneNeighbors = sorted([v for v in adjacency[parent] if len(adjacency[v]) == 1])
+            pendants.extend([(parent, v) for v in degreeOneNeighbors[1:]])
+        if numVertices - len(pendants) >= 3:
+            for parent, v in pendants:
+                removed[v] = 1
+                adjacency[parent].discard(v)
+                adjacency[v].clear()
+            self.removedPendants = pendants
+
+        # chain rule
+        visited = bytearray(numVertices)
+        for start in range(numVertices):
+            if removed[start] or visited[start] or len(adjacency[start]) != 2:
+                continue
+            chain, ends = walkChain(adjacency, start)
+            for v in chain:
+                visited[v] = 1
+            if ends is None or len(chain) < 3 or len(adjacency[ends[0]]) < 3 or len(adjacency[ends[1]]) < 3:
+                continue
+            first, last = chain[0], chain[-1]
+            for v in chain[1:-1]:
+                removed[v] = 1
+                adjacency[v].clear()
+            adjacency[first] = set([ends[0], last])
+            adjacency[last] = set([ends[1], first])
+            self.chains.append(tuple(chain))
+
+        # renumber the remaining vertices 0 to n' - 1 in their original order
+        self.vertexMap = [v for v in range(numVertices) if not removed[v]]  # kernel vertex -> original vertex
+        kernelIndex = {v: i for i, v in enumerate(self.vertexMap)}
+        self.graph = Graph()
+        self.graph.add_vertices([str(x) for x in range(len(self.vertexMap))])
+        self.graph.add_edges([(kernelIndex[v], kernelIndex[u]) for v in self.vertexMap for u in adjacency[v] if v < u])
+        self.originalVcount = numVertices
+        self.leafOffset = len(self.removedPendants)
+
+
+    # map (u, v) edges of a kernel spanning tree to the edges of a spanning tree of the original graph
+    def liftEdges(self, kernelTreeEdges) -> list:
+        treeEdges = set()
+        for source, target in kernelTreeEdges:
+            source, target = self.vertexMap[source], self.vertexMap[target]
+            treeEdges.add((min(source, target), max(source, target)))
+
+        for chain in self.chains:
+            shortcut = (min(chain[0], chain[-1]), max(chain[0], chain[-1]))
+            if shortcut in treeEdges:
+                treeEdges.remove(shortcut)
+                pathStart = 0
+            else:
+                pathStart = 1  # drop (u1, u2), the middle edge of the original path
+            for i in range(pathStart, len(chain) - 1):
+                treeEdges.add((min(chain[i], chain[i + 1]), max(chain[i], chain[i + 1])))
+
+        for parent, v in self.removedPendants:
+            treeEdges.add((min(parent, v), max(parent, v)))
+        return sorted(treeEdges)
+
+
+# follow the degree-2 vertices through start in both directions, returning (chain in path order, (end before, end after))
+# the ends are None if the chain closes up on itself (the whole component is a cycle)
+def walkChain(adjacency: list, start: int):
+    halves = []
+    ends = []
+    for firstStep in adjacency[start]:
+        previous, current = start, firstStep
+        half = []
+        while len(adjacency[current]) == 2 and current != start:
+            half.append(current)
+            nextVertex = [v for v in adjacency[current] if v != previous][0]
+            previous, current = current, nextVertex
+        if current == start:
+            return [start] + half, None
+        halves.append(half)
+        ends.append(current)
+    chain = halves[0][::-1] + [start] + halves[1]
+    return chain, (ends[0], ends[1])
@@ -0,0 +1,219 @@
+from array import array
+from SolutionAlgorithms.Profiling import SolverProfile
+
+'''
+Large-graph solver for inputs far beyond the 100-vertex / 2000-edge instances (10^5 to 10^6 vertices and more). It takes
+the edge arrays straight from GraphParser.readEdgeArrays, never builds an igraph Graph, and keeps everything in flat
+arrays: the CSR adjacency (offsets and neighbors) plus a constant number of n-sized arrays, so memory stays within a small
+multiple of the CSR itself.
+
+The forest is grown with the expansion rules of Solis-Oba's linear-time 2-approximation (the refinement of Lu and Ravi's
+leafy forest rules), which guarantee at least half the leaves of an optimal tree on simple connected graphs. In order of
+priority, a leaf x of the tree being grown is expanded when:
+    rule A: x has at least 3 neighbors outside the forest, which all become children of x
+    rule B: x has exactly 1 neighbor y outside the forest and y has at least 2, so y becomes a child of x and y's
+            neighbors outside the forest become children of y
+    rule C: x has exactly 2 neighbors outside the forest, which become children of x
+When no leaf can be expanded, a new tree is started at the vertex outside the forest with the most neighbors outside the
+forest, as long as it has at least 3. The trees and the leftover vertices are then joined into one spanning tree,
+preferring edges between non-leaves, then edges with at least one non-leaf, then anything.
+
+Every count of outside neighbors only goes down, so a leaf can only fall to lower rules. The leaves wait on one stack per
+rule and are re-checked when popped. A leaf is pushed again whenever its count drops to 2 or 1, so every leaf that
+qualifies for a rule has an entry on that rule's stack. Each leaf is pushed a constant number of times, every vertex
+joins the forest once (touching its adjacency once), and the roots come from a bucket queue with lazy re-insertion, so
+the forest takes O(n + m) time. The connection phase adds a near-constant union-find factor.
+'''
+
+def solve(numVertices: int, sources, targets, profile: SolverProfile = None):
+    if profile is not None:
+        profile.startPhase('csr')
+    offsets, neighbors, degrees = buildCSR(numVertices, sources, targets)
+    if profile is not None:
+        profile.endPhase()
+        profile.startPhase('forest')
+
+    inForest = bytearray(numVertices)
+    newCount = degrees  # neighbors outside the forest, which starts out as the degree
+    treeDegree = array('i', bytes(4 * numVertices))
+    components = array('i', range(numVertices))  # union-find parents; a vertex in the forest points at its tree's root
+    treeSources = array('i')
+    treeTargets = array('i')
+    buckets = vertexBuckets(newCount)
+    bucket = len(buckets) - 1
+
+    while True:
+        # next root: the vertex outside the forest with the most neighbors outside the forest, re-filed if its count fell
+        root = -1
+        while bucket >= 3 and root < 0:
+            if not buckets[bucket]:
+                bucket -= 1
+                continue
+            v = buckets[bucket].pop()
+            if inForest[v]:
+                continue
+            if newCount[v] < bucket:
+                buckets[newCount[v]].append(v)
+                continue
+            root = v
+        if root < 0:
+            break
+        if profile is not None:
+            profile.count('treesBuilt')
+
+        # stacks of leaves that may qualify for rule A (3 or more), rule B (1) and rule C (2)
+        ruleStacks = {3: array('i'), 1: array('i'), 2: array('i')}
+
+        def join(vertex: int, parent: int):
+            inForest[vertex] = 1
+            components[vertex] = root
+            for neighbor in neighbors[offsets[vertex]:offsets[vertex + 1]]:
+                count = newCount[neighbor] - 1
+                newCount[neighbor] = count
+                # a leaf of this tree that just dropped to a lower rule gets a new entry for it
+                if 0 < count < 3 and components[neighbor] == root and treeDegree[neighbor] == 1 and inForest[neighbor]:
+                    ruleStacks[count].append(neighbor)
+            if parent >= 0:
+                treeSources.append(parent)
+                treeTargets.append(vertex)
+                treeDegree[parent] += 1
+                treeDegree[vertex] += 1
+
+        def expand(vertex: int):
+            children = [neighbor for neighbor in neighbors[offsets[vertex]:offsets[vertex + 1]] if not inForest[neighbor]]
+            for child in children:
+                if not inForest[child]:  # a repeated edge lists the same child twice
+                    join(child, vertex)
+            for child in children:
+                if newCount[child] > 0 and treeDegree[child] == 1:
+                    ruleStacks[min(newCount[child], 3)].append(child)
+
+        join(root, -1)
+        expand(root)
+        while True:
+            if ruleStacks[3]:
+                leaf = ruleStacks[3].pop()
+                if newCount[leaf] < 3 or treeDegree[leaf] != 1:
+                    continue  # it already has a newer entry for the rule it falls under now
+                if profile is not None:
+                    profile.count('ruleAExpansions')
+                expand(leaf)
+            elif ruleStacks[1]:
+                leaf = ruleStacks[1].pop()
+                if newCount[leaf] != 1 or treeDegree[leaf] != 1:
+                    continue
+                outside = next(neighbor for neighbor in neighbors[offsets[leaf]:offsets[leaf + 1]] if not inForest[neighbor])
+                if newCount[outside] < 2:
+                    continue  # counts only go down, so this leaf can never take rule B again
+                if profile is not None:
+                    profile.count('ruleBExpansions')
+                join(outside, leaf)
+                expand(outside)
+            elif ruleStacks[2]:
+                leaf = ruleStacks[2].pop()
+                if newCount[leaf] != 2 or treeDegree[leaf] != 1:
+                    continue
+                if profile is not None:
+                    profile.count('ruleCExpansions')
+                expand(leaf)
+            else:
+                break
+
+    del offsets, neighbors, buckets  # the connection phase only needs the edge arrays
+    if profile is not None:
+        profile.endPhase()
+        profile.startPhase('connection')
+    connectComponents(sources, targets, treeSources, treeTargets, treeDegree, components)
+    if profile is not None:
+        profile.endPhase()
+        profile.startPhase('sort')
+    flatEdges = sortedEdges(numVertices, treeSources, treeTargets)
+    if profile is not None:
+        profile.endPhase()
+
+    numLeaves = treeDegree.count(1)
+    return flatEdges, numLeaves
+
+
+# CSR adjacency of the edge arrays (the neighbors of v are neighbors[offsets[v]:offsets[v + 1]]) and the degrees
+def buildCSR(numVertices: int, sources, targets):
+    degrees = array('i', bytes(4 * numVertices))
+    for source, target in zip(sources, targets):
+        degrees[source] += 1
+        degrees[target] += 1
+    offsets = array('q', bytes(8 * (numVertices + 1)))
+    for v in range(numVertices):
+        offsets[v + 1] = offsets[v] + degrees[v]
+    neighbors = array('i', bytes(4 * offsets[numVertices]))
+    nextSlot = offsets[:-1]
+    for source, target in zip(sources, targets):
+        neighbors[nextSlot[source]] = target
+        nextSlot[source] += 1
+        neighbors[nextSlot[target]] = source
+        nextSlot[target] += 1
+    return offsets, neighbors, degrees
+
+
+# bucket queue of the vertices by count: buckets[c] holds the vertices whose count was c when they were filed
+def vertexBuckets(counts):
+    buckets = [array('i') for _ in range(max(counts, default=0) + 1)]
+    for v, count in enumerate(counts):
+        buckets[count].append(v)
+    return buckets
+
+
+def find(components, vertex: int) -> int:
+    while components[vertex] != vertex:
+        components[vertex] = components[components[vertex]]  # path halving
+        vertex = components[vertex]
+    return vertex
+
+
+# join the trees and leftover vertices into one spanning tree in three passes over the edges, allowing first no leaf
+# endpoints, then one, then two (a leftover vertex has no tree edges, so it is not a leaf yet)
+def connectComponents(sources, targets, treeSources, treeTargets, treeDegree, components):
+    missingEdges = len(treeDegree) - 1 - len(treeSources)
+    for maxLeafEndpoints in (0, 1, 2):
+        if missingEdges <= 0:
+            return
+        for source, target in zip(sources, targets):
+            if (treeDegree[source] == 1) + (treeDegree[target] == 1) > maxLeafEndpoints:
+                continue
+            sourceRoot = find(components, source)
+            targetRoot = find(components, target)
+            if sourceRoot == targetRoot:
+                continue
+            components[targetRoot] = sourceRoot
+            treeSources.append(source)
+            treeTargets.append(target)
+            treeDegree[source] += 1
+            treeDegree[target] += 1
+            missingEdges -= 1
+            if missingEdges == 0:
+                return
+
+
+# the tree edges as a flat u0, v0, u1, v1, ... array with u < v, sorted the way solutionWriter.lexigraphicalEdgeOrder sorts them,
+# by two stable counting-sort passes (on v, then on u)
+def sortedEdges(numVertices: int, treeSources, treeTargets):
+    lows = array('i', map(min, treeSources, treeTargets))
+    highs = array('i', map(max, treeSources, treeTargets))
+    order = array('i', range(len(lows)))
+    for keys in (highs, lows):
+        starts = array('q', bytes(8 * (numVertices + 1)))
+        for key in keys:
+            starts[key + 1] += 1
+        for v in range(numVertices):
+            starts[v + 1] += starts[v]
+        sortedOrder = array('i', bytes(4 * len(order)))
+        for index in order:
+            key = keys[index]
+            sortedOrder[starts[key]] = index
+            starts[key] += 1
+        order = sortedOrder
+
+    flatEdges = array('i', bytes(8 * len(order)))
+    for position, index in enumerate(order):
+        flatEdges[2 * position] = lows[index]
+        flatEdges[2 * position + 1] = highs[index]
+    return flatEdges
@@ -0,0 +1,28 @@
+from SolutionAlgorithms.PreparedGraph import PreparedGraph
+import math
+
+'''
+Cheap bounds on the number of leaves of a max-leaf spanning tree.
+
+A spanning tree's interior vertices form a connected dominating set, so the leaf count is at most n minus a lower bound
+on the connected domination number. The lower bounds used here are all cheap:
+    - a tree with k interior vertices and maximum degree D has at most k(D - 2) + 2 leaves, so k >= (n - 2) / (D - 1)
+    - the interior of the tree contains a path between any two vertices except for its endpoints, so k >= diameter - 1
+    - a cut vertex can never be a leaf (removing a leaf leaves the tree connected), so k >= number of cut vertices
+'''
+
+def upperBoundLeaves(graph: PreparedGraph) -> int:
+    numVertices = graph.vcount
+    if numVertices <= 1:
+        return 0
+    if numVertices == 2:
+        return 2
+
+    maxDegree = graph.maxDegree
+    interiorLowerBound = max(
+        1,
+        math.ceil((numVertices - 2) / (maxDegree - 1)) if maxDegree > 1 else 1,
+        graph.diameter - 1,
+        len(graph.cutVertices),
+    )
+    return numVertices - interiorLowerBound
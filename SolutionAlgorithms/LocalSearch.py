@@ -0,0 +1,150 @@
+from igraph import Graph
+from SolutionAlgorithms.PreparedGraph import PreparedGraph, prepare
+import random
+import time
+
+'''
+Local search that improves a spanning tree with edge swaps: add a non-tree edge (u, v), which closes a cycle with the tree
+path from u to v, and remove one edge (a, b) of that path. The result is again a spanning tree, and since only the
+degrees of u, v, a and b change, the leaf delta of a swap is read off those four degrees in O(1). Finding the path uses
+parent pointers and depths, so evaluating every swap for one non-tree edge costs O(path length). Applying a swap only
+re-hangs the subtree that got cut off, so nothing is ever rebuilt from scratch.
+
+Only swaps that increase the leaf count are accepted. The search goes over the non-tree edges in random order and stops
+when a full pass finds nothing, or when the move budget (non-tree edges evaluated) or the time budget runs out.
+'''
+
+class EdgeSwapSearch:
+
+    def __init__(self, graph: Graph | PreparedGraph, treeEdges, rng: random.Random = random):
+        self.graph = prepare(graph)
+        self.rng = rng
+        numVertices = self.graph.vcount
+        self.treeAdjacency = [set() for _ in range(numVertices)]
+        for source, target in treeEdges:
+            self.treeAdjacency[source].add(target)
+            self.treeAdjacency[target].add(source)
+        self.numLeaves = len([v for v in range(numVertices) if len(self.treeAdjacency[v]) == 1])
+        self.movesEvaluated = 0
+        self.swapsApplied = 0
+
+        # root the tree at vertex 0 to get the parent pointers and depths
+        self.parent = [-1] * numVertices
+        self.depth = [0] * numVertices
+        if numVertices > 0:
+            self.hang(0, -1)
+
+
+    # make root's component hang from newParent (-1 for the tree root), fixing up parents and depths below it
+    def hang(self, root: int, newParent: int):
+        parent = self.parent
+        depth = self.depth
+        parent[root] = newParent
+        depth[root] = depth[newParent] + 1 if newParent >= 0 else 0
+        stack = [root]
+        while stack:
+            v = stack.pop()
+            for child in self.treeAdjacency[v]:
+                if child != parent[v]:
+                    parent[child] = v
+                    depth[child] = depth[v] + 1
+                    stack.append(child)
+
+
+    # tree path between u and v as a list of (child, parent) edges
+    def pathEdges(self, u: int, v: int):
+        parent = self.parent
+        depth = self.depth
+        edges = []
+        while depth[u] > depth[v]:
+            edges.append((u, parent[u]))
+            u = parent[u]
+        while depth[v] > depth[u]:
+            edges.append((v, parent[v]))
+            v = parent[v]
+        while u != v:
+            edges.append((u, parent[u]))
+            edges.append((v, parent[v]))
+            u, v = parent[u], parent[v]
+        return edges
+
+
+    # change in leaf count from adding (u, v) and removing (a, b)
+    def swapGain(self, u: int, v: int, a: int, b: int) -> int:
+        degreeChange = {u: 0, v: 0, a: 0, b: 0}
+        degreeChange[u] += 1
+        degreeChange[v] += 1
+        degreeChange[a] -= 1
+        degreeChange[b] -= 1
+        gain = 0
+        for vertex, change in degreeChange.items():
+            degree = len(self.treeAdjacency[vertex])
+            gain += (degree + change == 1) - (degree == 1)
+        return gain
+
+
+    # best edge to remove if (u, v) is added, as (gain, child endpoint, parent endpoint)
+    def bestSwapFor(self, u: int, v: int):
+        best = (0, None, None)
+        for child, parentVertex in self.pathEdges(u, v):
+            gain = self.swapGain(u, v, child, parentVertex)
+            if gain > best[0]:
+                best = (gain, child, parentVertex)
+                if gain == 2:  # the most a single swap can gain
+                    break
+        return best
+
+
+    def applySwap(self, u: int, v: int, child: int, parentVertex: int):
+        treeAdjacency = self.treeAdjacency
+        treeAdjacency[child].discard(parentVertex)
+        treeAdjacency[parentVertex].discard(child)
+        treeAdjacency[u].add(v)
+        treeAdjacency[v].add(u)
+
+        # the cut-off subtree is the one below child; it now hangs from whichever of u and v lies inside it
+        inside, outside = (u, v) if self.isBelow(u, child) else (v, u)
+        self.hang(inside, outside)
+
+
+    def isBelow(self, vertex: int, ancestor: int) -> bool:
+        while self.depth[vertex] > self.depth[ancestor]:
+            vertex = self.parent[vertex]
+        return vertex == ancestor
+
+
+    # run until no improving swap is left or a budget runs out, returning the number of leaves gained
+    def run(self, maxMoves: int = None, timeLimit: float = None) -> int:
+        deadline = time.time() + timeLimit if timeLimit is not None else None
+        startLeaves = self.numLeaves
+        treeAdjacency = self.treeAdjacency
+        improved = True
+        while improved:
+            improved = False
+            nonTreeEdges = [(u, v) for u, v in zip(self.graph.edgeSources, self.graph.edgeTargets) if v not in treeAdjacency[u]]
+            self.rng.shuffle(nonTreeEdges)
+            for u, v in nonTreeEdges:
+                if (maxMoves is not None and self.movesEvaluated >= maxMoves) or (deadline is not None and time.time() >= deadline):
+                    return self.numLeaves - startLeaves
+                if v in treeAdjacency[u]:  # became a tree edge through an earlier swap in this pass
+                    continue
+                self.movesEvaluated += 1
+                gain, child, parentVertex = self.bestSwapFor(u, v)
+                if gain > 0:
+                    self.applySwap(u, v, child, parentVertex)
+                    self.numLeaves += gain
+                    self.swapsApplied += 1
+                    improved = True
+        return self.numLeaves - startLeaves
+
+
+    def treeEdges(self):
+        return [(v, self.parent[v]) for v in range(self.graph.vcount) if self.parent[v] >= 0]
+
+
+# polish a spanning tree with improving edge swaps, returning (edges of the improved tree, its number of leaves)
+def improve(graph: Graph | PreparedGraph, treeEdges, maxMoves: int = None, timeLimit: float = None,
+            rng: random.Random = random):
+    search = EdgeSwapSearch(graph, treeEdges, rng)
+    search.run(maxMoves, timeLimit)
+    return search.treeEdges(), search.numLeaves
@@ -0,0 +1,37 @@
+from igraph import Graph
+from SolutionAlgorithms.CompactGraph import CompactGraph
+
+'''
+Read-only per-graph precomputation shared by every attempt (and every worker) that solves the same input graph.
+
+On top of the CompactGraph arrays it holds:
+    - maxDegree, and verticesByDegree[d]: the vertices of degree d in increasing order (the first root candidates of
+      ForestWithExpansionRules and the start vertex of DegreeOrderBFS)
+    - edgeSet: the edges as (min, max) pairs for the tree checks
+    - cutVertices, which are interior in every spanning tree, and the diameter (for LeafBounds and ExactBranchAndBound)
+Attempts only have to pay for their own randomized choices. Solvers take either an igraph Graph or a PreparedGraph and
+call prepare() to get the latter.
+'''
+
+class PreparedGraph(CompactGraph):
+
+    def __init__(self, graph: Graph):
+        super().__init__(graph)
+        degrees = self.degrees
+
+        self.maxDegree = max(degrees) if self.vcount > 0 else 0
+        self.verticesByDegree = [[] for _ in range(self.maxDegree + 1)]
+        for v in range(self.vcount):
+            self.verticesByDegree[degrees[v]].append(v)
+
+        self.edgeSet = set((min(source, target), max(source, target))
+                           for source, target in zip(self.edgeSources, self.edgeTargets))
+        self.cutVertices = sorted(graph.articulation_points())
+        self.diameter = graph.diameter() if self.vcount > 0 else 0
+
+
+# return the PreparedGraph for a graph, preparing it only if that hasn't been done already
+def prepare(graph) -> PreparedGraph:
+    if isinstance(graph, PreparedGraph):
+        return graph
+    return PreparedGraph(graph)
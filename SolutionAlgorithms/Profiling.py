@@ -0,0 +1,68 @@
+import time
+
+'''
+Optional instrumentation for the solvers: per-phase wall-clock timers, event counters and hooks.
+
+A solver takes profile=None and only touches the profile behind an "if profile is not None" check, so an attempt without a
+profile does no timing, no dictionary updates and no calls. Phases are timed with startPhase/endPhase around whole pieces
+of work (the root search for a tree, growing a tree, the connection phase), never around single expansions, so even a
+profiled attempt only pays for a few perf_counter calls per tree.
+
+Hooks are callables hook(event, name, value) that see everything as it happens:
+    ('phase', phase name, seconds) when a phase ends
+    ('count', counter name, amount) when a counter goes up
+They run in the process that runs the solver. multiStartRunner builds the profiles of its attempts itself, in worker
+processes or not, so hooks given to a MultiStartRunner are not live: they are replayed (see replay) over each graph's
+merged summary once that graph is done, one event per phase with its total seconds and one per counter with its total.
+'''
+
+class SolverProfile:
+
+    def __init__(self, hooks: list = None):
+        self.counters = {}
+        self.seconds = {}
+        self.hooks = list(hooks) if hooks is not None else []
+        self.phaseName = None
+        self.phaseStart = 0.0
+
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+        for hook in self.hooks:
+            hook('count', name, amount)
+
+
+    def startPhase(self, name: str):
+        self.phaseName = name
+        self.phaseStart = time.perf_counter()
+
+
+    def endPhase(self):
+        seconds = time.perf_counter() - self.phaseStart
+        self.seconds[self.phaseName] = self.seconds.get(self.phaseName, 0.0) + seconds
+        for hook in self.hooks:
+            hook('phase', self.phaseName, seconds)
+        self.phaseName = None
+
+
+    # add the counters and timers of another profile (or of a summary() of one) to this one, without firing hooks
+    def merge(self, other):
+        summary = other.summary() if isinstance(other, SolverProfile) else other
+        for name, amount in summary['counters'].items():
+            self.counters[name] = self.counters.get(name, 0) + amount
+        for name, seconds in summary['seconds'].items():
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+
+    # plain dictionaries, so the summary can be pickled back from a worker or written out as JSON
+    def summary(self) -> dict:
+        return {'counters': dict(self.counters), 'seconds': dict(self.seconds)}
+
+
+# fire the hooks over a summary() as if it had happened: one 'phase' event per phase, one 'count' event per counter
+def replay(summary: dict, hooks: list):
+    for hook in hooks:
+        for name, seconds in summary['seconds'].items():
+            hook('phase', name, seconds)
+        for name, amount in summary['counters'].items():
+            hook('count', name, amount)
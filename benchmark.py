@@ -0,0 +1,210 @@
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+import igraph
+from graphGenerator import generatePlantedGraph
+from graphParser import GraphParser
+from multiStartRunner import SOLVERS, SearchSettings, runGraph
+from SolutionAlgorithms.DisjointSet import DisjointSet
+
+'''
+Benchmark and regression harness for the solvers.
+
+Every registered solver (multiStartRunner.SOLVERS) is run over the bundled instance files and over generated families of
+growing size, through the same runGraph that main.py uses, so with the same --attempts and --seed the leaf counts match
+what main.py writes. For each graph it records the leaves, the attempts used, the wall-clock time for the graph and per
+attempt, and the peak memory allocated while solving it (measured with tracemalloc in a separate single-attempt run,
+since tracing slows the timed run down too much to share it).
+
+The results are written to a JSON file. Given a baseline, the run fails (exit status 1) when a solver's total leaves on an
+instance set drop below the baseline by more than --leaf-tolerance, or its time per attempt on a set grows by more than
+--time-tolerance (a fraction). The baseline is either a JSON file from an earlier benchmark run (which has timings) or
+summary files like all-hard.out_summary.txt (which only have leaves), given as INSTANCES=SUMMARY and compared against
+--summary-solver. Runs from a baseline JSON only count when they used the same attempts and seed, and generated families
+are named with their sizes (e.g. grid:100,1000) so only runs over the same graphs are compared.
+'''
+
+DEFAULT_INSTANCES = ['test.in', 'hard.in', 'all-hard.in']
+DEFAULT_SIZES = [100, 1000, 5000]
+
+
+# generated graphs of numVertices vertices; the igraph generators draw from the random module, so the seed fixes them
+def generateFamily(family: str, numVertices: int, seed: int) -> igraph.Graph:
+    random.seed(f'{family}:{numVertices}:{seed}')
+    if family == 'grid':
+        side = max(2, round(numVertices ** 0.5))
+        graph = igraph.Graph.Lattice([side, side], circular=False)
+    elif family == 'random':
+        graph = igraph.Graph.Erdos_Renyi(n=numVertices, m=3 * numVertices)
+    elif family == 'scalefree':
+        graph = igraph.Graph.Barabasi(numVertices, 2)
+    elif family == 'geometric':
+        graph = igraph.Graph.GRG(numVertices, (8 / numVertices) ** 0.5)
+    elif family == 'planted':
+        # a hidden tree with 60% of the vertices as leaves, from graphGenerator's stress generator
+        sources, targets = generatePlantedGraph(numVertices, numVertices * 3 // 5, numVertices, numVertices // 2,
+                                                random.Random(f'{family}:{numVertices}:{seed}'))
+        graph = igraph.Graph(n=numVertices, edges=list(zip(sources, targets)))
+    else:
+        raise Exception(f'Unknown graph family "{family}", expected one of {list(FAMILIES)}')
+    graph.simplify()
+    connectComponents(graph)
+    graph.vs['name'] = [str(x) for x in range(graph.vcount())]
+    return graph
+
+
+FAMILIES = ('grid', 'random', 'scalefree', 'geometric', 'planted')
+
+
+# link every other component to vertex 0's with a single edge, so the random families are always connected
+def connectComponents(graph: igraph.Graph):
+    components = DisjointSet(graph.vcount())
+    for source, target in graph.get_edgelist():
+        components.union(source, target)
+    extraEdges = []
+    for v in range(1, graph.vcount()):
+        # every vertex below v is already connected to vertex 0 by now, so any of them can take the edge
+        if components.union(0, v):
+            extraEdges.append((random.randrange(v), v))
+    graph.add_edges(extraEdges)
+
+
+# time one graph with the full budget, then trace the allocations of a single attempt
+def benchmarkGraph(graph: igraph.Graph, settings: SearchSettings, graphNum: int):
+    startTime = time.perf_counter()
+    _, numLeaves, attemptsUsed, _, upperBound, _, _, _, _ = runGraph(graph, settings, graphNum)
+    seconds = time.perf_counter() - startTime
+
+    tracemalloc.start()
+    runGraph(graph, SearchSettings(settings.solverName, 1, settings.seed, validation=settings.validation), graphNum)
+    peakBytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'graphNum': graphNum,
+        'vertices': graph.vcount(),
+        'edges': graph.ecount(),
+        'leaves': numLeaves,
+        'upperBound': upperBound,
+        'attempts': attemptsUsed,
+        'seconds': seconds,
+        'secondsPerAttempt': seconds / max(1, attemptsUsed),
+        'peakBytes': peakBytes,
+    }
+
+
+def benchmarkSet(name: str, graphs, settings: SearchSettings):
+    records = []
+    for graphNum, graph in graphs:
+        records.append(benchmarkGraph(graph, settings, graphNum))
+        print(f'{settings.solverName} {name} graph {graphNum}: |V|={records[-1]["vertices"]}, leaves = {records[-1]["leaves"]}, '
+              f'{records[-1]["seconds"]:.3f}s')
+    totalAttempts = sum(record['attempts'] for record in records)
+    totalSeconds = sum(record['seconds'] for record in records)
+    return {
+        'solver': settings.solverName,
+        'instances': name,
+        'attempts': settings.numAttempts,
+        'seed': settings.seed,
+        'graphs': records,
+        'totalLeaves': sum(record['leaves'] for record in records),
+        'totalSeconds': totalSeconds,
+        'secondsPerAttempt': totalSeconds / max(1, totalAttempts),
+        'peakBytes': max([record['peakBytes'] for record in records], default=0),
+    }
+
+
+def readInstances(filename: str):
+    parser = GraphParser(filename)
+    for graphNum in range(len(parser)):
+        yield graphNum, parser.readGraph(graphNum)
+    parser.close()
+
+
+# (solver, instance set) -> list of baseline runs; summaries count as runs of summarySolver with leaves only
+def readBaseline(filename: str = None, summaries: list = None, summarySolver: str = None):
+    baseline = {}
+    if filename is not None:
+        with open(filename, 'r') as file:
+            for run in json.load(file)['runs']:
+                baseline.setdefault((run['solver'], run['instances']), []).append(run)
+    for summary in summaries or []:
+        instances, _, summaryFilename = summary.partition('=')
+        if not summaryFilename:
+            raise Exception(f'Expected INSTANCES=SUMMARY, got "{summary}"')
+        with open(summaryFilename, 'r') as file:
+            leaves = sum(int(line) for line in file if line.strip())
+        baseline.setdefault((summarySolver, instances), []).append({'totalLeaves': leaves})
+    return baseline
+
+
+# messages for every run that got worse than the baseline by more than the tolerances
+# runs from a baseline JSON are only compared when they used the same attempts and seed, since both change the numbers
+def findRegressions(runs: list, baseline: dict, leafTolerance: int, timeTolerance: float):
+    regressions = []
+    for run in runs:
+        for reference in baseline.get((run['solver'], run['instances']), []):
+            if 'attempts' in reference and (reference['attempts'], reference['seed']) != (run['attempts'], run['seed']):
+                continue
+            if run['totalLeaves'] < reference['totalLeaves'] - leafTolerance:
+                regressions.append(f'{run["solver"]} on {run["instances"]}: {run["totalLeaves"]} leaves, '
+                                   f'baseline has {reference["totalLeaves"]}')
+            if 'secondsPerAttempt' in reference and run['secondsPerAttempt'] > reference['secondsPerAttempt'] * (1 + timeTolerance):
+                regressions.append(f'{run["solver"]} on {run["instances"]}: {run["secondsPerAttempt"] * 1000:.3f} ms per attempt, '
+                                   f'baseline has {reference["secondsPerAttempt"] * 1000:.3f} ms')
+    return regressions
+
+
+def parseArguments():
+    argParser = argparse.ArgumentParser(description='Benchmark the solvers and check them against a baseline.')
+    argParser.add_argument('--solvers', nargs='+', default=list(SOLVERS.keys()), choices=list(SOLVERS.keys()))
+    argParser.add_argument('--instances', nargs='*', default=DEFAULT_INSTANCES, help='instance files to run')
+    argParser.add_argument('--families', nargs='*', default=list(FAMILIES), choices=list(FAMILIES),
+                           help='generated graph families to run')
+    argParser.add_argument('--sizes', nargs='*', type=int, default=DEFAULT_SIZES, help='vertex counts of the generated graphs')
+    argParser.add_argument('--attempts', type=int, default=10, help='attempts per graph')
+    argParser.add_argument('--seed', type=int, default=0)
+    argParser.add_argument('--output', default='benchmark.json', help='JSON file for the results')
+    argParser.add_argument('--baseline', default=None, help='JSON results of an earlier run to compare against')
+    argParser.add_argument('--baseline-summary', nargs='*', default=[], metavar='INSTANCES=SUMMARY',
+                           help='summary files to compare the leaves against, e.g. all-hard.in=all-hard.out_summary.txt')
+    argParser.add_argument('--summary-solver', default='ForestWithExpansionRules', choices=list(SOLVERS.keys()),
+                           help='solver whose results are compared against the summary files')
+    argParser.add_argument('--leaf-tolerance', type=int, default=0, help='leaves a set may lose before it counts as a regression')
+    argParser.add_argument('--time-tolerance', type=float, default=0.25,
+                           help='fraction the time per attempt may grow before it counts as a regression')
+    return argParser.parse_args()
+
+
+def main():
+    args = parseArguments()
+    baseline = readBaseline(args.baseline, args.baseline_summary, args.summary_solver)
+    runs = []
+    for solverName in args.solvers:
+        settings = SearchSettings(solverName, args.attempts, args.seed)
+        for filename in args.instances:
+            runs.append(benchmarkSet(filename, readInstances(filename), settings))
+        for family in args.families:
+            graphs = ((graphNum, generateFamily(family, size, args.seed)) for graphNum, size in enumerate(args.sizes))
+            runs.append(benchmarkSet(f'{family}:{",".join(str(size) for size in args.sizes)}', graphs, settings))
+
+    with open(args.output, 'w') as file:
+        json.dump({'attempts': args.attempts, 'seed': args.seed, 'python': sys.version.split()[0], 'runs': runs}, file, indent=1)
+
+    print(f'{"solver":25} {"instances":24} {"leaves":>8} {"seconds":>9} {"ms/attempt":>11} {"peak KiB":>9}')
+    for run in runs:
+        print(f'{run["solver"]:25} {run["instances"]:24} {run["totalLeaves"]:8} {run["totalSeconds"]:9.2f} '
+              f'{run["secondsPerAttempt"] * 1000:11.3f} {run["peakBytes"] // 1024:9}')
+
+    regressions = findRegressions(runs, baseline, args.leaf_tolerance, args.time_tolerance)
+    for regression in regressions:
+        print(f'REGRESSION: {regression}')
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+'''
+Compact binary container for instance files (like all-hard.in) and solution files (like all-hard.out), with converters
+from and to the text formats.
+
+Layout (little-endian):
+    header (32 bytes): magic b'MLSG', version, kind (INSTANCES or SOLUTIONS), edge item size (2 for int16, 4 for int32),
+                       number of graphs, byte offset of the footer
+    edge array: the (u, v) pairs of every graph back to back, as one contiguous int16/int32 array
+    footer: for each graph (numVertices, numEdges, numLeaves) (numLeaves is -1 for instances), then an offset table with
+            the index of each graph's first edge in the edge array, plus the total number of edges
+Since the tables live in the footer, a graph can be appended by writing its edges over the old footer and writing a new
+footer after them; the edge array stays contiguous. A reader memory-maps the file and copies out one graph's edges at a
+time, so reading a graph doesn't load the rest of the file.
+
+Text written back out from the binary format is byte-identical to what the repo's writers produce (SolutionWriter,
+graphGenerator.outputGraphToFile). Hand-edited text with stray whitespace comes back normalized.
+'''
+
+MAGIC = b'MLSG'
+VERSION = 1
+INSTANCES = 0
+SOLUTIONS = 1
+HEADER = struct.Struct('<4sHHB3xIQ8x')
+GRAPH_ENTRY = struct.Struct('<IIi4x')
+OFFSET_ENTRY = struct.Struct('<Q')
+ITEM_TYPECODES = {2: 'h', 4: 'i'}
+
+
+def isBinaryFile(filename: str) -> bool:
+    with open(filename, 'rb') as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+class BinaryGraphFile:
+
+    def __init__(self, filename: str):
+        self.file = open(filename, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.kind, self.itemSize, self.numGraphs, footerOffset = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise Exception(f'{filename} is not a version {VERSION} binary graph file')
+        self.graphs = [GRAPH_ENTRY.unpack_from(self.data, footerOffset + GRAPH_ENTRY.size * k) for k in range(self.numGraphs)]
+        offsetTable = footerOffset + GRAPH_ENTRY.size * self.numGraphs
+        self.edgeOffsets = [OFFSET_ENTRY.unpack_from(self.data, offsetTable + OFFSET_ENTRY.size * k)[0]
+                            for k in range(self.numGraphs + 1)]
+
+
+    def __len__(self):
+        return self.numGraphs
+
+
+    # (numVertices, numEdges, numLeaves) of graph k
+    def graphInfo(self, k: int):
+        return self.graphs[k]
+
+
+    # graph k's edges as a flat u0, v0, u1, v1, ... array
+    def readFlatEdges(self, k: int) -> array:
+        start = HEADER.size + 2 * self.itemSize * self.edgeOffsets[k]
+        end = HEADER.size + 2 * self.itemSize * self.edgeOffsets[k + 1]
+        edges = array(ITEM_TYPECODES[self.itemSize])
+        edges.frombytes(self.data[start:end])
+        if sys.byteorder != 'little':
+            edges.byteswap()
+        return edges
+
+
+    # (number of vertices, edge sources, edge targets) of graph k, the same as GraphParser.readEdgeArrays
+    def readEdgeArrays(self, k: int):
+        edges = array('i', self.readFlatEdges(k))
+        return self.graphs[k][0], edges[0::2], edges[1::2]
+
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+
+# append one graph to a binary file, creating the file if it doesn't exist yet
+def appendGraph(filename: str, kind: int, numVertices: int, edges, numLeaves: int = -1, itemSize: int = None):
+    appendGraphs(filename, kind, [(numVertices, edges, numLeaves)], itemSize)
+
+
+# append (numVertices, edges, numLeaves) graphs to a binary file in one write, creating the file if it doesn't exist yet
+# (edges are (u, v) pairs, or an array that already holds them flat as u0, v0, u1, v1, ...)
+def appendGraphs(filename: str, kind: int, newGraphs, itemSize: int = None):
+    graphs, edgeOffsets = [], [0]
+    if os.path.isfile(filename) and os.path.getsize(filename) > 0:
+        existing = BinaryGraphFile(filename)
+        if existing.kind != kind:
+            existing.close()
+            raise Exception(f'{filename} does not hold {"solutions" if kind == SOLUTIONS else "instances"}')
+        graphs, edgeOffsets, itemSize = list(existing.graphs), list(existing.edgeOffsets), existing.itemSize
+        existing.close()
+    elif itemSize is None:
+        itemSize = 2 if max([graph[0] for graph in newGraphs], default=0) <= 2 ** 15 else 4
+    edgeArrayEnd = HEADER.size + 2 * itemSize * edgeOffsets[-1]
+
+    flatEdges = array(ITEM_TYPECODES[itemSize])
+    for numVertices, edges, numLeaves in newGraphs:
+        if numVertices > 2 ** (8 * itemSize - 1):
+            raise Exception(f'{filename} stores vertices as int{8 * itemSize}, which cannot hold {numVertices} vertices')
+        numEdges = len(edges) // 2 if isinstance(edges, array) else len(edges)
+        if isinstance(edges, array):
+            flatEdges.extend(edges if edges.typecode == flatEdges.typecode else array(flatEdges.typecode, edges))
+        else:
+            flatEdges.extend([vertex for edge in edges for vertex in edge])
+        graphs.append((numVertices, numEdges, numLeaves))
+        edgeOffsets.append(edgeOffsets[-1] + numEdges)
+    if sys.byteorder != 'little':
+        flatEdges.byteswap()
+
+    with open(filename, 'r+b' if os.path.isfile(filename) else 'wb') as file:
+        file.seek(edgeArrayEnd)
+        file.write(flatEdges.tobytes())
+        writeFooter(file, kind, itemSize, graphs, edgeOffsets)
+
+
+# drop every graph after the first numGraphs
+def truncateGraphs(filename: str, numGraphs: int):
+    existing = BinaryGraphFile(filename)
+    kind, itemSize = existing.kind, existing.itemSize
+    graphs, edgeOffsets = existing.graphs[:numGraphs], existing.edgeOffsets[:numGraphs + 1]
+    existing.close()
+    with open(filename, 'r+b') as file:
+        file.seek(HEADER.size + 2 * itemSize * edgeOffsets[-1])
+        writeFooter(file, kind, itemSize, graphs, edgeOffsets)
+
+
+# write the footer at the current position, cut the file off after it and point the header at it
+def writeFooter(file, kind: int, itemSize: int, graphs, edgeOffsets):
+    footerOffset = file.tell()
+    for graph in graphs:
+        file.write(GRAPH_ENTRY.pack(*graph))
+    for offset in edgeOffsets:
+        file.write(OFFSET_ENTRY.pack(offset))
+    file.truncate()
+    file.seek(0)
+    file.write(HEADER.pack(MAGIC, VERSION, kind, itemSize, len(graphs), footerOffset))
+
+
+# read a text instance file (count line, then "n m" and m edge lines per graph) as a list of (n, edges, -1)
+def readTextInstances(filename: str):
+    with open(filename, 'rb') as file:
+        fields = file.read().split()
+    graphs = []
+    position = 1
+    for _ in range(int(fields[0])):
+        numVertices, numEdges = int(fields[position]), int(fields[position + 1])
+        position += 2
+        edgeFields = list(map(int, fields[position:position + 2 * numEdges]))
+        position += 2 * numEdges
+        graphs.append((numVertices, list(zip(edgeFields[0::2], edgeFields[1::2])), -1))
+    return graphs
+
+
+# read a text solution file ("leaves m" and m edge lines per tree, no count line) as a list of (n, edges, leaves)
+def readTextSolutions(filename: str):
+    with open(filename, 'rb') as file:
+        fields = file.read().split()
+    graphs = []
+    position = 0
+    while position < len(fields):
+        numLeaves, numEdges = int(fields[position]), int(fields[position + 1])
+        position += 2
+        edgeFields = list(map(int, fields[position:position + 2 * numEdges]))
+        position += 2 * numEdges
+        graphs.append((numEdges + 1, list(zip(edgeFields[0::2], edgeFields[1::2])), numLeaves))
+    return graphs
+
+
+def textToBinary(textFilename: str, binaryFilename: str, kind: int = INSTANCES):
+    graphs = readTextInstances(textFilename) if kind == INSTANCES else readTextSolutions(textFilename)
+    maxVertices = max([graph[0] for graph in graphs], default=0)
+    if os.path.isfile(binaryFilename):
+        os.remove(binaryFilename)
+    appendGraphs(binaryFilename, kind, graphs, 2 if maxVertices <= 2 ** 15 else 4)
+
+
+def binaryToText(binaryFilename: str, textFilename: str):
+    binaryFile = BinaryGraphFile(binaryFilename)
+    with open(textFilename, 'w') as file:
+        if binaryFile.kind == INSTANCES:
+            file.write(f'{len(binaryFile)}\n')
+        for k in range(len(binaryFile)):
+            numVertices, numEdges, numLeaves = binaryFile.graphInfo(k)
+            file.write(f'{numVertices if binaryFile.kind == INSTANCES else numLeaves} {numEdges}\n')
+            flatEdges = binaryFile.readFlatEdges(k)
+            file.write(''.join(f'{flatEdges[i]} {flatEdges[i + 1]}\n' for i in range(0, len(flatEdges), 2)))
+    binaryFile.close()
+
+
+def main():
+    argParser = argparse.ArgumentParser(description='Convert graph files between the text and binary formats.')
+    argParser.add_argument('direction', choices=['to-binary', 'to-text'])
+    argParser.add_argument('source')
+    argParser.add_argument('destination')
+    argParser.add_argument('--solutions', action='store_true', help='the text file is a solution file (like all-hard.out)')
+    args = argParser.parse_args()
+    if args.direction == 'to-binary':
+        textToBinary(args.source, args.destination, SOLUTIONS if args.solutions else INSTANCES)
+    else:
+        binaryToText(args.source, args.destination)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,77 @@
 from igraph import *
+from array import array
+from SolutionAlgorithms.DisjointSet import DisjointSet
+import argparse
+import binaryFormat
+import os
 import random
 
+'''
+Instance generators. With no arguments this appends the small hard instances to hard.in as it always has. With
+--vertices it runs the stress generator instead (generatePlantedGraph), which scales to millions of edges: it plants a
+spanning tree with exactly --leaves leaves, hides it under extra edges that are sampled at random (never by listing all
+the candidate pairs), and writes each graph out as soon as it is generated, as text or in the binary format, together
+with a <output>_planted.txt file that has the planted leaf count of every graph (a lower bound on the best tree, in the
+same one-number-per-line format as the _summary.txt files). Everything is drawn from one random.Random(--seed), so the
+same arguments give the same file on any machine.
+'''
+
+TEXT_CHUNK_EDGES = 1 << 16
+
+
 def main():
-    
+    args = parseArguments()
+    if args.vertices is None:
+        random.seed(args.seed)
+        writeHardInstances()
+    else:
+        writeStressInstances(args)
+
+
+def parseArguments():
+    argParser = argparse.ArgumentParser(description='Generate max-leaf spanning tree instances.')
+    argParser.add_argument('--seed', type=int, default=None, help='seed for reproducible instances')
+    argParser.add_argument('--vertices', type=int, default=None,
+                           help='generate stress instances with this many vertices (otherwise append the hard instances to hard.in)')
+    argParser.add_argument('--leaves', type=int, default=None, help='leaves of the planted tree (default: 60%% of the vertices)')
+    argParser.add_argument('--leaf-edges', type=int, default=None,
+                           help='extra edges between leaves that hide the planted tree (default: as many as the vertices)')
+    argParser.add_argument('--extra-edges', type=int, default=None,
+                           help='extra edges that mostly join branches (default: half as many as the vertices)')
+    argParser.add_argument('--graphs', type=int, default=1, help='number of graphs to generate')
+    argParser.add_argument('--output', default='stress.in')
+    argParser.add_argument('--format', default='text', choices=['text', 'binary'])
+    return argParser.parse_args()
+
+
+def writeStressInstances(args):
+    numVertices = args.vertices
+    numLeaves = args.leaves if args.leaves is not None else numVertices * 3 // 5
+    numLeafEdges = args.leaf_edges if args.leaf_edges is not None else numVertices
+    numExtraEdges = args.extra_edges if args.extra_edges is not None else numVertices // 2
+    rng = random.Random(args.seed)
+
+    # start from an empty file either way, so the same arguments always give the same file
+    if args.format == 'text':
+        with open(args.output, 'w') as file:
+            file.write(f'{args.graphs}\n')
+    elif os.path.isfile(args.output):
+        os.remove(args.output)
+    with open(args.output + '_planted.txt', 'w') as summary:
+        for graphNum in range(args.graphs):
+            sources, targets = generatePlantedGraph(numVertices, numLeaves, numLeafEdges, numExtraEdges, rng)
+            if args.format == 'text':
+                appendTextGraph(args.output, numVertices, sources, targets)
+            else:
+                flatEdges = array('i', bytes(8 * len(sources)))
+                flatEdges[0::2] = sources
+                flatEdges[1::2] = targets
+                binaryFormat.appendGraph(args.output, binaryFormat.INSTANCES, numVertices, flatEdges)
+            summary.write(f'{numLeaves}\n')
+            print(f'Graph {graphNum}: |V|={numVertices}, |E|={len(sources)}, planted leaves = {numLeaves}')
+
+
+def writeHardInstances():
     # generate a random connected bipartite graph using the igraph library
     bipartiteGraph = Graph.Random_Bipartite(40, 60, p=0.3)
     while not bipartiteGraph.is_connected():
@@ -102,6 +171,105 @@ def getSetIndex(listOfSets, element):
     return None
 
 
+'''
+Stress instance with numVertices vertices whose planted spanning tree has exactly numLeaves leaves, returned as edge
+source and target arrays (in no particular order). Like generateGraph:
+    - numLeaves random vertices are leaves and the rest are branches; random pairs of branches are joined until the
+      branches are connected (tracked with a DisjointSet instead of a list of sets), and every leaf hangs off a branch,
+      with each branch that would otherwise end up as a leaf getting a leaf of its own first so it stays a branch
+    - up to numLeafEdges edges are added between random pairs of leaves, with each leaf limited to one less than its
+      parent's degree so the graph doesn't get connected enough to make leafy trees easy to find
+    - up to numExtraEdges edges are added between random vertices, picking a branch for each end with probability
+      branchChance
+Random pairs that are repeats or loops are skipped; the sampling gives up after a few times the requested number of
+misses, so on very dense requests a graph can come out with fewer extra edges.
+'''
+def generatePlantedGraph(numVertices: int, numLeaves: int, numLeafEdges: int, numExtraEdges: int,
+                         rng: random.Random = random, branchChance: float = 0.8):
+    numBranches = numVertices - numLeaves
+    if numBranches < 1 or numLeaves < 2:
+        raise Exception(f'A planted tree on {numVertices} vertices needs at least 2 leaves and 1 branch, not {numLeaves} leaves')
+    vertices = array('i', range(numVertices))
+    rng.shuffle(vertices)
+    leaves, branches = vertices[:numLeaves], vertices[numLeaves:]
+    sources, targets = array('i'), array('i')
+    edgeKeys = set()  # u * numVertices + v for every edge with u < v
+    treeDegree = array('i', bytes(4 * numVertices))
+
+    def addEdge(u: int, v: int) -> bool:
+        key = min(u, v) * numVertices + max(u, v)
+        if u == v or key in edgeKeys:
+            return False
+        edgeKeys.add(key)
+        sources.append(u)
+        targets.append(v)
+        return True
+
+    # connect the branches
+    components = DisjointSet(numVertices)
+    numBranchSets = numBranches
+    while numBranchSets > 1:
+        branch1 = branches[rng.randrange(numBranches)]
+        branch2 = branches[rng.randrange(numBranches)]
+        if components.union(branch1, branch2):
+            addEdge(branch1, branch2)
+            treeDegree[branch1] += 1
+            treeDegree[branch2] += 1
+            numBranchSets -= 1
+
+    # hang the leaves, first on the branches that need them to have a degree of at least 2
+    parents = array('i', [branch for branch in branches for _ in range(max(0, 2 - treeDegree[branch]))])
+    if len(parents) > numLeaves:
+        raise Exception(f'The branch tree needs {len(parents)} leaves to keep its branches, but only {numLeaves} were asked for')
+    parents.extend(branches[rng.randrange(numBranches)] for _ in range(numLeaves - len(parents)))
+    for leaf, parent in zip(leaves, parents):
+        addEdge(leaf, parent)
+        treeDegree[leaf] += 1
+        treeDegree[parent] += 1
+
+    # hide the planted tree under edges between leaves, keeping each leaf's degree below its parent's
+    degreeRemaining = array('i', bytes(4 * numVertices))
+    for leaf, parent in zip(leaves, parents):
+        degreeRemaining[leaf] = treeDegree[parent] - 1
+    available = array('i', [leaf for leaf in leaves if degreeRemaining[leaf] > 0])
+    numAdded, numMisses = 0, 0
+    while numAdded < numLeafEdges and len(available) >= 2 and numMisses < 4 * numLeafEdges + 100:
+        index1, index2 = rng.randrange(len(available)), rng.randrange(len(available))
+        leaf1, leaf2 = available[index1], available[index2]
+        if not addEdge(leaf1, leaf2):
+            numMisses += 1
+            continue
+        numAdded += 1
+        degreeRemaining[leaf1] -= 1
+        degreeRemaining[leaf2] -= 1
+        # drop leaves that used up their budget, higher index first so the other index stays valid
+        for index in sorted((index1, index2), reverse=True):
+            if degreeRemaining[available[index]] == 0:
+                available[index] = available[-1]
+                available.pop()
+
+    # then edges that mostly join branches
+    numAdded, numMisses = 0, 0
+    while numAdded < numExtraEdges and numMisses < 4 * numExtraEdges + 100:
+        v1 = branches[rng.randrange(numBranches)] if rng.random() < branchChance else leaves[rng.randrange(numLeaves)]
+        v2 = branches[rng.randrange(numBranches)] if rng.random() < branchChance else leaves[rng.randrange(numLeaves)]
+        if addEdge(v1, v2):
+            numAdded += 1
+        else:
+            numMisses += 1
+
+    return sources, targets
+
+
+# append a graph given as edge arrays to a text instance file, a chunk of edges at a time
+def appendTextGraph(filename: str, numVertices: int, sources, targets):
+    with open(filename, 'a') as file:
+        file.write(f'{numVertices} {len(sources)}\n')
+        for start in range(0, len(sources), TEXT_CHUNK_EDGES):
+            file.write(''.join(f'{source} {target}\n' for source, target in
+                               zip(sources[start:start + TEXT_CHUNK_EDGES], targets[start:start + TEXT_CHUNK_EDGES])))
+
+
 def outputGraphToFile(graph: Graph, filename: str):
     file = open(filename, 'a')
     file.write(f'{graph.vcount()} {graph.ecount()}\n')
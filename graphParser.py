@@ -1,34 +1,93 @@
 import igraph
+import mmap
+from array import array
+from binaryFormat import BinaryGraphFile, isBinaryFile
+
+'''
+Reader for the text instance format: a line with the number of graphs, then for each graph a "numVertices numEdges" line
+followed by one "u v" line per edge.
+
+The file is memory-mapped rather than read line by line. Opening it builds an index of the byte offset where each graph
+starts (by hopping over the edge lines of each header, without parsing them), so graphs can be read in order with
+readNextGraph()/iteration, or directly by number with readGraph(k), without touching the graphs before them. A graph's
+edge block is parsed into integer arrays in one pass and the igraph Graph is built with a single constructor call.
+
+Files in the binary format (see binaryFormat) are recognized by their magic number and read through BinaryGraphFile,
+which already has the offset table, so nothing needs to be indexed or parsed.
+'''
+
+PARSE_SLICE_BYTES = 1 << 20
+
 
 class GraphParser:
 
-    def __init__(self, filename):
-        self.file = open(filename, 'r')
-        self.numRemainingGraphs = int(self.file.readline())
+    def __init__(self, filename, progress: bool = False):
+        self.progress = progress  # print a line for each graph read, like the old line-by-line parser did
+        self.binaryFile = None
+        if isBinaryFile(filename):
+            self.binaryFile = BinaryGraphFile(filename)
+            self.numGraphs = len(self.binaryFile)
+        else:
+            self.file = open(filename, 'rb')
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.offsets = self.buildIndex()
+            self.numGraphs = len(self.offsets) - 1
+        self.numRemainingGraphs = self.numGraphs
         self.graphNum = 0
-        self.line = 2
 
-    
-    def readNextGraph(self) -> igraph.Graph:
-        if self.numRemainingGraphs <= 0:
-            raise Exception("No remaining graphs to read.")
-        print(f'Graph {self.graphNum}: line {self.line}')
 
-        self.numRemainingGraphs -= 1
+    # byte offset of the header line of each graph, plus the end of the last graph
+    def buildIndex(self):
+        data = self.data
+        position = data.find(b'\n') + 1
+        numGraphs = int(data[:position])
+        offsets = []
+        for _ in range(numGraphs):
+            offsets.append(position)
+            headerEnd = data.find(b'\n', position)
+            numEdges = int(data[position:headerEnd].split()[1])
+            position = headerEnd + 1
+            for _ in range(numEdges):
+                position = data.find(b'\n', position) + 1
+            if position == 0:  # last edge line without a trailing newline
+                position = len(data)
+        offsets.append(position)
+        return offsets
 
-        headerFields = self.file.readline().split()
-        self.line += 1
-        numVertices = int(headerFields[0])
-        numEdges = int(headerFields[1])
 
-        graph = igraph.Graph()
-        graph.add_vertices([str(x) for x in range(numVertices)]) # need to name the vertices
-        while numEdges > 0: 
-            edgeFields = self.file.readline().split()
-            self.line += 1
-            graph.add_edge(int(edgeFields[0]), int(edgeFields[1]))
-            numEdges = numEdges - 1
+    # (number of vertices, edge sources, edge targets) of graph k, without building an igraph Graph
+    def readEdgeArrays(self, k: int):
+        if not 0 <= k < self.numGraphs:
+            raise Exception(f'No graph {k} in this file, it has {self.numGraphs} graphs.')
+        if self.binaryFile is not None:
+            return self.binaryFile.readEdgeArrays(k)
+        # parse in slices that end on a line break, so a huge graph never has all of its fields as bytes objects at once
+        fields = array('i')
+        start, end = self.offsets[k], self.offsets[k + 1]
+        while start < end:
+            sliceEnd = end
+            if end - start > PARSE_SLICE_BYTES:
+                sliceEnd = self.data.rfind(b'\n', start, start + PARSE_SLICE_BYTES) + 1 or end
+            fields.extend(map(int, self.data[start:sliceEnd].split()))
+            start = sliceEnd
+        numVertices, numEdges = fields[0], fields[1]
+        return numVertices, fields[2:2 + 2 * numEdges:2], fields[3:3 + 2 * numEdges:2]
 
+
+    def readGraph(self, k: int) -> igraph.Graph:
+        numVertices, sources, targets = self.readEdgeArrays(k)
+        if self.progress:
+            print(f'Graph {k}: byte {self.offsets[k]}' if self.binaryFile is None else f'Graph {k}')
+        graph = igraph.Graph(n=numVertices, edges=list(zip(sources, targets)))
+        graph.vs['name'] = [str(x) for x in range(numVertices)] # need to name the vertices
+        return graph
+
+
+    def readNextGraph(self) -> igraph.Graph:
+        if self.numRemainingGraphs <= 0:
+            raise Exception("No remaining graphs to read.")
+        graph = self.readGraph(self.graphNum)
+        self.numRemainingGraphs -= 1
         self.graphNum += 1
         return graph
 
@@ -37,5 +96,19 @@ class GraphParser:
         return self.numRemainingGraphs > 0
 
 
+    def __len__(self):
+        return self.numGraphs
+
+
+    # lazily iterate over the remaining graphs
+    def __iter__(self):
+        while self.hasNext():
+            yield self.readNextGraph()
+
+
     def close(self):
-        self.file.close()
+        if self.binaryFile is not None:
+            self.binaryFile.close()
+        else:
+            self.data.close()
+            self.file.close()
@@ -1,128 +1,222 @@
+import argparse
+import json
 import os
-import igraph
+import time
 from graphParser import GraphParser
-# from SolutionAlgorithms import DegreeOrderBFS
-from SolutionAlgorithms import ForestWithExpansionRules
+from SolutionAlgorithms import LargeGraphExpansion
+from SolutionAlgorithms.Profiling import SolverProfile
+from multiStartRunner import ALGORITHM_VERSIONS, MultiStartRunner, SearchSettings, SOLVERS, VALIDATION_MODES
+from portfolioScheduler import ARMS, mergeSummaries
+from solutionCache import SolutionCache
+from solutionValidation import assertValidInputGraph
+from solutionWriter import SolutionWriter
 
 def main():
-    inputFilename = 'all-hard.in'
-    outputFilename = 'all-hard.out'
-    numAttempts = 500
+    args = parseArguments()
+    inputFilename = args.input
+    outputFilename = args.output
 
-    # generate new output filename if it already exists
-    if os.path.isfile(outputFilename):
+    # generate new output filename if it already exists (unless we are picking that output back up)
+    if os.path.isfile(outputFilename) and not args.resume:
         i = 1
         while os.path.isfile(f'{outputFilename} ({i})'):
             i = i + 1
         outputFilename = f'{outputFilename} ({i})'
 
+    # run algorithm multiple times on each graph and take the best solution found
+    # each attempt has its own seed, so the output only depends on --seed (not on --workers)
     parser = GraphParser(inputFilename)
-    graphNum = 0
-    while parser.hasNext():
-        graph = parser.readNextGraph()
+    if args.portfolio is not None and args.workers > 1 and args.parallel == 'attempts':
+        # the bandit picks each attempt from the results of the ones before it, so only whole graphs can go to the workers
+        print('--portfolio hands whole graphs to the workers, so --parallel is set to graphs')
+        args.parallel = 'graphs'
+    settings = SearchSettings(args.solver, args.attempts, args.seed, args.time_limit, args.stagnation, args.validate,
+                              args.kernelize, args.polish, args.polish_moves, args.polish_time,
+                              args.exact, args.exact_time_limit, args.profile is not None, args.portfolio)
+    writer = SolutionWriter(outputFilename, inputFilename, args.output_format == 'binary', args.checkpoint_every,
+                            args.resume, args.improve_finished)
+    if writer.nextGraph() > 0:
+        print(f'Resuming {outputFilename} after graph {writer.nextGraph() - 1}')
+    profileFile = open(args.profile, 'w') if args.profile is not None else None
+    if args.large:
+        solveLargeGraphs(parser, writer, profileFile,
+                         readSummary(args.baseline_summary) if args.baseline_summary is not None else None)
+        if profileFile is not None:
+            profileFile.close()
+        writer.close()
+        parser.close()
+        return
+
+    cache = SolutionCache(args.cache, args.cache_max_mb * 2 ** 20, ALGORITHM_VERSIONS) if args.cache is not None else None
+    runner = MultiStartRunner(settings, args.workers, args.parallel, cache)
+    results = []
+    startTime = time.time()
+    for graph, result in runner.solveAll(readGraphs(parser, writer)):
+        # write graph out to file and print to console for progress tracking
+        result.numLeaves = writer.write(result.graphNum, result.tree, result.numLeaves)
+        print(f'Graph {result.graphNum}: |V|={graph.vcount()}, |E|={graph.ecount()}, leaves = {result.numLeaves}'
+              + (' (cached)' if result.fromCache else ''))
+        if profileFile is not None and result.profile is not None:
+            writeProfile(profileFile, result.graphNum, graph.vcount(), graph.ecount(), result.numLeaves, result.attemptsUsed,
+                         result.seconds, result.profile)
+        result.tree = None  # only the numbers are kept for the report
+        results.append(result)
+    if profileFile is not None:
+        profileFile.close()
+    writer.close()
+    runner.close()
+    parser.close()
+    printReport(results, time.time() - startTime,
+                readSummary(args.baseline_summary) if args.baseline_summary is not None else None)
+
+
+def parseArguments():
+    argParser = argparse.ArgumentParser(description='Find max-leaf spanning trees for every graph in an input file.')
+    argParser.add_argument('--input', default='all-hard.in')
+    argParser.add_argument('--output', default='all-hard.out')
+    argParser.add_argument('--output-format', default='text', choices=['text', 'binary'],
+                           help='format of the solution file (the input format is detected automatically)')
+    argParser.add_argument('--solver', default='ForestWithExpansionRules', choices=list(SOLVERS.keys()))
+    argParser.add_argument('--attempts', type=int, default=500, help='attempts per graph')
+    argParser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+    argParser.add_argument('--parallel', default='attempts', choices=['attempts', 'graphs'],
+                           help='spread the attempts of each graph over the workers, or give each worker whole graphs')
+    argParser.add_argument('--seed', type=int, default=0, help='base seed for the per-attempt seeds')
+    argParser.add_argument('--time-limit', type=float, default=None, help='wall-clock seconds per graph')
+    argParser.add_argument('--stagnation', type=int, default=None,
+                           help='stop a graph after this many attempts without an improvement')
+    argParser.add_argument('--validate', default='improvements', choices=list(VALIDATION_MODES),
+                           help='which attempts get the lightweight tree check (the winner always gets the full check)')
+    argParser.add_argument('--kernelize', action='store_true',
+                           help='run the solver on the reduced kernel of each graph and lift the trees back')
+    argParser.add_argument('--polish', action='store_true', help='improve the best tree of each graph with edge swaps')
+    argParser.add_argument('--polish-moves', type=int, default=None, help='non-tree edges the polishing may evaluate per graph')
+    argParser.add_argument('--polish-time', type=float, default=None, help='wall-clock seconds of polishing per graph')
+    argParser.add_argument('--exact', action='store_true',
+                           help='try to improve the best tree of each graph and prove it optimal with branch and bound')
+    argParser.add_argument('--exact-time-limit', type=float, default=10.0, help='wall-clock seconds of exact search per graph')
+    argParser.add_argument('--portfolio', nargs='*', default=None, choices=list(ARMS.keys()), metavar='ARM',
+                           help='instead of --solver, spread the attempts of each graph over these arms of '
+                                'portfolioScheduler.ARMS (all of them if none are given) by leaf gain per CPU-second; '
+                                'with workers, each worker takes whole graphs')
+    argParser.add_argument('--large', action='store_true',
+                           help='large-graph mode: no size limits or igraph objects, one run of the 2-approximation in '
+                                'LargeGraphExpansion per graph (the solver, attempt and search options do not apply)')
+    argParser.add_argument('--resume', action='store_true',
+                           help='continue the output file from its last checkpoint instead of starting a new file')
+    argParser.add_argument('--improve-finished', action='store_true',
+                           help='with --resume, also solve the finished graphs again and keep whichever tree has more leaves')
+    argParser.add_argument('--checkpoint-every', type=int, default=10,
+                           help='graphs between flushes of the output file and its resume manifest')
+    argParser.add_argument('--cache', default=None,
+                           help='directory of cached trees: graphs whose budget was already spent are answered from it, '
+                                'the others start from the cached tree')
+    argParser.add_argument('--cache-max-mb', type=float, default=256, help='size limit of the cache directory')
+    argParser.add_argument('--profile', default=None,
+                           help='profile the solver and write one JSON line per graph with its phase times and counters')
+    argParser.add_argument('--baseline-summary', default=None,
+                           help='summary file (one leaf count per line) to compare the results against in the report')
+    return argParser.parse_args()
+
+
+# end-of-run report: where the budget went, how far each graph is from its leaf upper bound, what polishing added, which
+# portfolio arm found each tree, and how each graph compares with a baseline run if one is given. The total seconds are
+# the run's wall-clock time; the graph seconds summed over graphs only match it when the graphs ran one after another.
+def printReport(results, wallSeconds: float, baselineLeaves: list = None):
+    portfolioResults = [result for result in results if result.portfolio is not None]
+    print('graph  leaves  bound  gap  optimal  attempts  seconds  polish' + ('  baseline  change' if baselineLeaves is not None else '')
+          + ('  arm' if portfolioResults else ''))
+    for result in results:
+        line = (f'{result.graphNum:5}  {result.numLeaves:6}  {result.upperBound:5}  {result.gap():3}  '
+                f'{"yes" if result.provedOptimal else "no":>7}  {result.attemptsUsed:8}  '
+                f'{result.seconds:7.2f}  {result.polishGain:+6}')
+        if baselineLeaves is not None and result.graphNum < len(baselineLeaves):
+            line += f'  {baselineLeaves[result.graphNum]:8}  {result.numLeaves - baselineLeaves[result.graphNum]:+6}'
+        elif baselineLeaves is not None and portfolioResults:
+            line += ' ' * 18
+        if result.portfolio is not None:
+            line += f'  {result.portfolio["winner"]}'
+        print(line)
+    if baselineLeaves is not None:
+        comparedResults = [result for result in results if result.graphNum < len(baselineLeaves)]
+        print(f'change against baseline = {sum(result.numLeaves - baselineLeaves[result.graphNum] for result in comparedResults):+} '
+              f'over {len(comparedResults)} graphs')
+    print(f'total leaves = {sum(result.numLeaves for result in results)}, '
+          f'polish gain = {sum(result.polishGain for result in results)}, '
+          f'total gap = {sum(result.gap() for result in results)}, '
+          f'proven optimal = {len([result for result in results if result.provedOptimal])}, '
+          f'attempts = {sum(result.attemptsUsed for result in results)}, '
+          f'seconds = {wallSeconds:.2f}, summed graph seconds = {sum(result.seconds for result in results):.2f}')
+    if portfolioResults:
+        printPortfolioReport(mergeSummaries(result.portfolio for result in portfolioResults))
+
+
+# per portfolio arm: the graphs whose tree it found, its attempts, the leaves it gained over the best so far, and its CPU time
+def printPortfolioReport(armTotals: dict):
+    print(f'{"arm":32} {"wins":>5} {"attempts":>8} {"gain":>6} {"cpu s":>8} {"gain/s":>8}')
+    for name, total in armTotals.items():
+        print(f'{name:32} {total["wins"]:5} {total["pulls"]:8} {total["gain"]:6} {total["seconds"]:8.2f} '
+              f'{total["gain"] / max(total["seconds"], 1e-9):8.1f}')
+
+
+# large-graph mode: solve straight from the edge arrays and stream each tree to the writer, without the input checks
+# one LargeGraphExpansion run per graph, compared with baselineLeaves (like the _planted.txt of graphGenerator) if given
+def solveLargeGraphs(parser: GraphParser, writer: SolutionWriter, profileFile=None, baselineLeaves: list = None):
+    totalLeaves = 0
+    totalChange, numCompared = 0, 0
+    for graphNum in range(len(parser)):
+        if writer.finished(graphNum):
+            continue
+        startTime = time.time()
+        profile = SolverProfile() if profileFile is not None else None
+        numVertices, sources, targets = parser.readEdgeArrays(graphNum)
+        flatEdges, numLeaves = LargeGraphExpansion.solve(numVertices, sources, targets, profile)
+        numLeaves = writer.writeEdges(graphNum, numVertices, flatEdges, numLeaves)
+        totalLeaves += numLeaves
+        seconds = time.time() - startTime
+        line = f'Graph {graphNum}: |V|={numVertices}, |E|={len(sources)}, leaves = {numLeaves}, {seconds:.2f}s'
+        if baselineLeaves is not None and graphNum < len(baselineLeaves):
+            line += f', baseline = {baselineLeaves[graphNum]} ({numLeaves - baselineLeaves[graphNum]:+})'
+            totalChange += numLeaves - baselineLeaves[graphNum]
+            numCompared += 1
+        print(line)
+        if profile is not None:
+            writeProfile(profileFile, graphNum, numVertices, len(sources), numLeaves, 1, seconds, profile.summary())
+    if baselineLeaves is not None:
+        print(f'change against baseline = {totalChange:+} over {numCompared} graphs')
+    print(f'total leaves = {totalLeaves} (each tree has at least half the leaves of an optimal one)')
+
+
+def writeProfile(file, graphNum: int, numVertices: int, numEdges: int, numLeaves: int, attempts: int, seconds: float,
+                 profile: dict):
+    file.write(json.dumps({
+        'graphNum': graphNum,
+        'vertices': numVertices,
+        'edges': numEdges,
+        'leaves': numLeaves,
+        'attempts': attempts,
+        'seconds': seconds,
+        'phaseSeconds': profile['seconds'],
+        'counters': profile['counters'],
+    }) + '\n')
+
+
+def readSummary(filename: str):
+    with open(filename, 'r') as file:
+        return [int(line) for line in file if line.strip()]
+
+
+# yields (graph number, graph) for every graph the writer does not already have a solution for
+def readGraphs(parser: GraphParser, writer: SolutionWriter = None):
+    for graphNum in range(len(parser)):
+        if writer is not None and writer.finished(graphNum):
+            continue
+        graph = parser.readGraph(graphNum)
         try:
             assertValidInputGraph(graph)
         except Exception as e:
             print(f'Error with instance {graphNum}: {str(e)}')
-        
-        # run algorithm multiple times on each graph and take the best solution found
-        # this makes use of some randomness due to set hashing (although diminishing returns are likely heavy)
-        solutions = []
-        for i in range(numAttempts):
-            solutionTree, numLeaves = ForestWithExpansionRules.solve(graph)
-            assertValidSolution(graph, solutionTree, numLeaves)
-            solutions.append((solutionTree, numLeaves))
-        maxSolution = (None, -1)
-        for solution in solutions:
-            if solution[1] > maxSolution[1]:
-                maxSolution = solution
-        assert maxSolution is not None
-
-        # write graph out to file and print to console for progress tracking
-        print(f'Graph {graphNum}: |V|={graph.vcount()}, |E|={graph.ecount()}, leaves = {numLeaves}')
-        writeGraphToFile(maxSolution[0], maxSolution[1], outputFilename)
-        graphNum += 1
-    parser.close()
-
-
-def assertValidInputGraph(graph: igraph.Graph):
-    assert graph.is_connected()
-    assert graph.vcount() <= 100
-    assert graph.ecount() <= 2000
-    
-    # check that the graph doesn't contain duplicate or self edges
-    adjacencyList = {}
-    for edge in graph.es:
-        assert edge.source != edge.target
-        if edge.source < edge.target:
-            if edge.source not in adjacencyList.keys():
-                adjacencyList[edge.source] = set()
-            assert edge.target not in adjacencyList[edge.source]
-            adjacencyList[edge.source].add(edge.target)
-        else:
-            if edge.target not in adjacencyList.keys():
-                adjacencyList[edge.target] = set()
-            assert edge.source not in adjacencyList[edge.target]
-            adjacencyList[edge.target].add(edge.source)
-
-
-def assertValidSolution(originalGraph: igraph.Graph, solutionTree: igraph.Graph, numLeaves):
-    assert solutionTree.is_connected()
-    
-    # assert correct number of edges to be a tree
-    assert solutionTree.ecount() == solutionTree.vcount() - 1
-
-    # assert that all vertices are included and no other ones are added
-    vertexSet = set()
-    for edge in solutionTree.to_tuple_list():
-        vertexSet.add(edge[0])
-        vertexSet.add(edge[1])
-    numberSet = set(range(originalGraph.vcount()))
-    verticesNotIncluded = numberSet.difference(vertexSet)
-    assert len(verticesNotIncluded) == 0, f'Solution did not contain vertices {verticesNotIncluded}'
-    extraVertices = vertexSet.difference(numberSet)
-    assert len(extraVertices) == 0, f'Solution was not supposed to contain vertices {extraVertices}'
-
-    # assert number of leaves is correct
-    realLeaves = len([indegree for indegree in solutionTree.indegree() if indegree == 1])
-    assert numLeaves == realLeaves, f'Solution was supposed to contain {numLeaves} leaves, but instead contained {realLeaves} leaves'
-
-
-def writeGraphToFile(graph: igraph.Graph, numLeaves, filename: str):
-    file = open(filename, 'a')
-    file.write(f'{numLeaves} {graph.ecount()}\n')
-
-    edgeList = lexigraphicalEdgeOrder(graph)
-    for edge in edgeList:
-        file.write(f'{edge[0]} {edge[1]}\n')
-
-    file.close()
-
-    file2 = open(filename + '_summary.txt', 'a')
-    file2.write(f'{numLeaves}\n')
-    file2.close()
-
-
-def lexigraphicalEdgeOrder(graph: igraph.Graph):
-    adjacency_list = {}
-    for edge in graph.es:
-        source = int(graph.vs[edge.source]["name"])
-        target = int(graph.vs[edge.target]["name"])
-        if source < target:
-            a = source
-            b = target
-        else:
-            b = source
-            a = target
-        if a not in adjacency_list.keys():
-            adjacency_list[a] = []
-        adjacency_list[a].append(b)
-    
-    edges = []
-    for node in sorted(adjacency_list.keys()):
-        for neighbor in sorted(adjacency_list[node]):
-            edges.append((node, neighbor))
-    return edges     
+        yield graphNum, graph
 
 
 if __name__ == '__main__':
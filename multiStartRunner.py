@@ -0,0 +1,548 @@
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from igraph import Graph
+from SolutionAlgorithms import DegreeOrderBFS
+from SolutionAlgorithms import ExactBranchAndBound
+from SolutionAlgorithms import ForestWithExpansionRules
+from SolutionAlgorithms.CompactGraph import buildTree
+from SolutionAlgorithms.Kernelization import Kernel
+from SolutionAlgorithms.LeafBounds import upperBoundLeaves
+from SolutionAlgorithms.LocalSearch import improve
+from SolutionAlgorithms.PreparedGraph import PreparedGraph, prepare
+from SolutionAlgorithms.Profiling import SolverProfile, replay
+from portfolioScheduler import ARMS, PortfolioScheduler, armParts
+from solutionCache import CacheEntry, SolutionCache, graphHash
+from solutionValidation import assertValidSolution, assertValidTreeEdges
+
+'''
+Multi-start search: run a randomized solver many times on one graph and keep the tree with the most leaves.
+
+Every attempt gets its own explicit seed (derived from the base seed, the graph number and the attempt number), so a run
+is reproducible for the same seed no matter how the attempts are spread over worker processes. Ties between equally
+leafy trees go to the lowest attempt number for the same reason.
+
+With more than one worker the attempts are spread over a ProcessPoolExecutor, either by splitting each graph's
+attempts into one interleaved chunk per worker ('attempts') or by giving each worker whole graphs ('graphs'). Either way
+a worker gets each graph once and only sends back the edges of its best tree and its leaf count. The graph is prepared
+(see PreparedGraph) once in the main process, and that read-only copy is what every attempt and worker uses.
+
+The search for a graph is anytime: besides the attempt budget it can be given a wall-clock limit and a stagnation limit
+(stop after that many attempts without an improvement), and it always stops once the best tree reaches the cheap upper
+bound from LeafBounds, since no tree can do better than that. A time limit makes the result depend on machine speed.
+When attempts are spread over workers, the chunks share their progress (see SharedProgress, handed to every worker by the
+executor's initializer): the best leaf count, the attempt that last raised it and a stop flag. Every attempt checks the
+limits against that shared state, and the first chunk to hit one stops all the others. Since the interleaved chunks only
+move through the attempts in about the order a serial run would, the attempt count can differ a little from a serial
+run that uses the same limits.
+
+With kernelize set, the attempts run on the kernel of the graph (see Kernelization) and the best tree is lifted back to
+the original numbering before it is checked and reported. With polish set, the best tree of the multi-start search is
+improved with edge swaps (see LocalSearch) within the polish budget before that. With exact set, the result is then
+handed to ExactBranchAndBound as its incumbent, to be improved and proven optimal within exactTimeLimit seconds; when the
+time runs out the incumbent is kept and the gap to the bound is reported.
+
+With a SolutionCache, a graph whose cached tree is proven optimal, or was found by attempts seeded the same way (same
+algorithm, seed and graph number) with at least the requested budget, is answered from the cache without any search.
+Otherwise the cached tree is the incumbent. If its attempts were seeded the same way, the search continues at the first
+attempt the cached run did not get to and the incumbent wins ties, so the result is the same as one longer run (with
+polish or exact, the cached tree was already improved, so it can come out better). A tree from other seeds (such as a
+repeat of the same graph under another graph number) only replaces the search's result when it has more leaves.
+
+With profile set, every attempt gets a SolverProfile and the per-graph steps (preparing or kernelizing the graph,
+polishing, the exact search) are timed as phases of the same profile. The merged summary of a graph ends up in
+GraphResult.profile, and the runner's profile hooks are replayed over it (see Profiling.replay).
+
+With a portfolio (a list of arm names from portfolioScheduler.ARMS), the solver setting is ignored and each attempt goes
+to the arm picked by a PortfolioScheduler, a bandit that favors the arms with the most leaf gain per CPU-second on the
+graph (see runPortfolio). The bandit needs every result before it picks the next arm, so the attempts of a graph always
+run in one process: with workers, a portfolio needs the 'graphs' parallelism, and the runner refuses 'attempts'.
+GraphResult.portfolio has what every arm did and which arm found the best tree.
+'''
+
+SOLVERS = {
+    'ForestWithExpansionRules': ForestWithExpansionRules,
+    'DegreeOrderBFS': DegreeOrderBFS,
+}
+
+# bump the entry for a solver or step whenever a change alters the trees it produces, so stale cached trees are dropped
+ALGORITHM_VERSIONS = {
+    'ForestWithExpansionRules': 2,
+    'DegreeOrderBFS': 1,
+    'kernelize': 1,
+    'polish': 1,
+    'exact': 1,
+    'portfolio': 1,
+}
+
+# how often the attempt loop checks trees with the lightweight assertValidTreeEdges:
+#     'every': every attempt, 'improvements': only attempts that beat the best so far, 'final': never
+# the winning tree of every graph is always checked with the full assertValidSolution
+VALIDATION_MODES = ('every', 'improvements', 'final')
+
+
+# everything that decides how a single graph is searched; picklable so it can be sent to the workers with the graph
+class SearchSettings:
+
+    def __init__(self, solverName: str = 'ForestWithExpansionRules', numAttempts: int = 500, seed: int = 0,
+                 timeLimit: float = None, stagnation: int = None, validation: str = 'improvements', kernelize: bool = False,
+                 polish: bool = False, polishMoves: int = None, polishTime: float = None, exact: bool = False,
+                 exactTimeLimit: float = None, profile: bool = False, portfolio: list = None):
+        if solverName not in SOLVERS:
+            raise Exception(f'Unknown solver "{solverName}", expected one of {list(SOLVERS.keys())}')
+        if validation not in VALIDATION_MODES:
+            raise Exception(f'Unknown validation mode "{validation}", expected one of {list(VALIDATION_MODES)}')
+        for armName in portfolio or []:
+            if armName not in ARMS:
+                raise Exception(f'Unknown portfolio arm "{armName}", expected one of {list(ARMS.keys())}')
+        self.solverName = solverName
+        self.numAttempts = numAttempts
+        self.seed = seed
+        self.timeLimit = timeLimit
+        self.stagnation = stagnation
+        self.validation = validation
+        self.kernelize = kernelize
+        self.polish = polish
+        self.polishMoves = polishMoves
+        self.polishTime = polishTime
+        self.exact = exact
+        self.exactTimeLimit = exactTimeLimit
+        self.profile = profile
+        self.portfolio = (list(portfolio) or list(ARMS.keys())) if portfolio is not None else None  # an empty list means every arm
+
+
+class GraphResult:
+
+    def __init__(self, graphNum: int, tree: Graph, numLeaves: int, attemptsUsed: int, seconds: float, upperBound: int,
+                 polishGain: int = 0, provedOptimal: bool = False, profile: dict = None, portfolio: dict = None):
+        self.graphNum = graphNum
+        self.tree = tree
+        self.numLeaves = numLeaves
+        self.attemptsUsed = attemptsUsed
+        self.seconds = seconds
+        self.upperBound = upperBound
+        self.polishGain = polishGain  # leaves added by local search on top of the best multi-start tree
+        self.provedOptimal = provedOptimal or numLeaves >= upperBound
+        self.fromCache = False
+        self.profile = profile  # SolverProfile.summary() of the search, if it was profiled
+        self.portfolio = portfolio  # PortfolioScheduler.summary() of the search, if it used a portfolio
+
+
+    def gap(self) -> int:
+        return self.upperBound - self.numLeaves
+
+
+# build the winning tree of a graph and give it the full check before it is reported
+def finalResult(graph: Graph, graphNum: int, bestEdges, bestLeaves: int, attemptsUsed: int, seconds: float, upperBound: int,
+                polishGain: int, provedOptimal: bool, profile: dict = None, portfolio: dict = None):
+    tree = buildTree(graph.vcount(), bestEdges)
+    assertValidSolution(graph, tree, bestLeaves)
+    return GraphResult(graphNum, tree, bestLeaves, attemptsUsed, seconds, upperBound, polishGain, provedOptimal, profile,
+                       portfolio)
+
+
+# the solver (or portfolio) and the optional steps that decide which trees the search produces,
+# e.g. 'ForestWithExpansionRules+polish' or 'portfolio(forest,bfs)+exact'
+def algorithmName(settings: SearchSettings) -> str:
+    searchName = f'portfolio({",".join(settings.portfolio)})' if settings.portfolio is not None else settings.solverName
+    return '+'.join([searchName] + searchSteps(settings))
+
+
+# the ALGORITHM_VERSIONS entries of everything algorithmName covers
+def algorithmParts(settings: SearchSettings) -> list:
+    searchParts = ['portfolio'] + armParts(settings.portfolio) if settings.portfolio is not None else [settings.solverName]
+    return list(dict.fromkeys(searchParts + searchSteps(settings)))
+
+
+def searchSteps(settings: SearchSettings) -> list:
+    return [step for step, used in (('kernelize', settings.kernelize), ('polish', settings.polish), ('exact', settings.exact))
+            if used]
+
+
+# a tree found earlier for the graph (on the input numbering) that the search has to beat, and the first attempt to run
+class Incumbent:
+
+    def __init__(self, edges, numLeaves: int, firstAttempt: int):
+        self.edges = edges
+        self.numLeaves = numLeaves
+        self.firstAttempt = firstAttempt
+
+
+# the incumbent wins ties when it came from earlier attempts of the same sequence (firstAttempt > 0) or the search ran
+# no attempts; a tree from other seeds has to be strictly better, so ties keep what a run without the cache would give
+def adoptIncumbent(bestEdges, bestLeaves: int, incumbent: Incumbent):
+    if incumbent is None:
+        return bestEdges, bestLeaves
+    winsTies = incumbent.firstAttempt > 0
+    if bestEdges is None or incumbent.numLeaves > bestLeaves or (winsTies and incumbent.numLeaves == bestLeaves):
+        return incumbent.edges, incumbent.numLeaves
+    return bestEdges, bestLeaves
+
+
+def attemptSeed(baseSeed: int, graphNum: int, attempt: int) -> str:
+    return f'{baseSeed}:{graphNum}:{attempt}'  # string seeds are hashed deterministically by random.Random
+
+
+'''
+Progress of one graph's search shared by all the workers running its chunks: the best leaf count so far, the attempt that
+last raised it, and a flag that tells every chunk to stop. It lives in shared memory, so it has to reach the workers when
+they start (as the executor's initializer argument) rather than with each task; the main process resets it before each
+graph.
+'''
+class SharedProgress:
+
+    def __init__(self):
+        self.lock = multiprocessing.Lock()
+        self.bestLeaves = multiprocessing.RawValue('q', -1)
+        self.lastImprovement = multiprocessing.RawValue('q', -1)
+        self.stopped = multiprocessing.RawValue('b', 0)
+
+
+    def reset(self, bestLeaves: int, lastImprovement: int):
+        with self.lock:
+            self.bestLeaves.value = bestLeaves
+            self.lastImprovement.value = lastImprovement
+            self.stopped.value = 0
+
+
+    # book an attempt's leaves and return whether the search should stop (for every chunk, not just this one)
+    def record(self, attempt: int, numLeaves: int, stagnation: int, deadline: float, targetLeaves: int) -> bool:
+        with self.lock:
+            if numLeaves > self.bestLeaves.value:
+                self.bestLeaves.value = numLeaves
+                self.lastImprovement.value = max(self.lastImprovement.value, attempt)
+            if ((targetLeaves is not None and self.bestLeaves.value >= targetLeaves)
+                    or (stagnation is not None and attempt - self.lastImprovement.value >= stagnation)
+                    or (deadline is not None and time.time() >= deadline)):
+                self.stopped.value = 1
+            return bool(self.stopped.value)
+
+
+workerProgress = None  # the SharedProgress of a worker process, set by initWorker
+
+
+def initWorker(progress: SharedProgress):
+    global workerProgress
+    workerProgress = progress
+
+
+# runAttempts for a chunk running in a worker, with the limits checked against the progress shared by all the chunks
+def runWorkerAttempts(graph: PreparedGraph, settings: SearchSettings, graphNum: int, attempts: range, deadline: float,
+                      targetLeaves: int):
+    return runAttempts(graph, settings, graphNum, attempts, deadline, targetLeaves, progress=workerProgress)
+
+
+'''
+Run the given attempts serially, stopping early if the time passes deadline, the best reaches targetLeaves, or
+settings.stagnation attempts go by without beating the best so far (which starts out as incumbentLeaves, found at
+attempt lastImprovement). With a SharedProgress, those limits are checked against it instead, and the attempts also stop
+as soon as another chunk stops the search. Returns (edges of the best tree of these attempts, its leaves, the attempt
+number that found it, attempts used, SolverProfile summary of the attempts or None if settings.profile is off).
+'''
+def runAttempts(graph: PreparedGraph, settings: SearchSettings, graphNum: int, attempts: range, deadline: float = None,
+                targetLeaves: int = None, incumbentLeaves: int = -1, lastImprovement: int = -1,
+                progress: SharedProgress = None):
+    solver = SOLVERS[settings.solverName]
+    profile = SolverProfile() if settings.profile else None
+    bestEdges, bestLeaves, bestAttempt = None, -1, None
+    attemptsUsed = 0
+    for attempt in attempts:
+        if progress is not None and progress.stopped.value:
+            break
+        solutionTree, numLeaves = solver.solve(graph, rng=random.Random(attemptSeed(settings.seed, graphNum, attempt)),
+                                               profile=profile)
+        attemptsUsed += 1
+        if settings.validation == 'every' or (settings.validation == 'improvements' and numLeaves > bestLeaves):
+            assertValidTreeEdges(graph.vcount, solutionTree.get_edgelist(), numLeaves, graph.edgeSet)
+
+        # only the best tree so far is kept
+        if numLeaves > bestLeaves:
+            bestEdges, bestLeaves, bestAttempt = solutionTree.get_edgelist(), numLeaves, attempt
+        if progress is not None:
+            if progress.record(attempt, numLeaves, settings.stagnation, deadline, targetLeaves):
+                break
+            continue
+        if numLeaves > incumbentLeaves:
+            incumbentLeaves, lastImprovement = numLeaves, attempt
+
+        if targetLeaves is not None and incumbentLeaves >= targetLeaves:
+            break
+        if settings.stagnation is not None and attempt - lastImprovement >= settings.stagnation:
+            break
+        if deadline is not None and time.time() >= deadline:
+            break
+    return bestEdges, bestLeaves, bestAttempt, attemptsUsed, profile.summary() if profile is not None else None
+
+
+'''
+runAttempts for a portfolio: each attempt runs the arm the PortfolioScheduler picks, with the attempt's seed, timed in
+CPU-seconds and polished if the arm says so. Stops on the same conditions as runAttempts, or once only spent deterministic
+arms are left. Returns the same values as runAttempts plus the scheduler's summary.
+'''
+def runPortfolio(graph: PreparedGraph, settings: SearchSettings, graphNum: int, attempts: range, deadline: float = None,
+                 targetLeaves: int = None, incumbentLeaves: int = -1, lastImprovement: int = -1):
+    profile = SolverProfile() if settings.profile else None
+    scheduler = PortfolioScheduler(settings.portfolio, incumbentLeaves)
+    bestEdges, bestLeaves, bestAttempt = None, -1, None
+    attemptsUsed = 0
+    for attempt in attempts:
+        armIndex = scheduler.chooseArm()
+        if armIndex is None:
+            break
+        arm = scheduler.arms[armIndex]
+        rng = random.Random(attemptSeed(settings.seed, graphNum, attempt))
+        startSeconds = time.process_time()
+        solutionTree, numLeaves = arm.solver.solve(graph, rng=rng, profile=profile, **arm.solveArguments)
+        edges = solutionTree.get_edgelist()
+        if arm.polishMoves is not None:
+            edges, numLeaves = improve(graph, edges, arm.polishMoves, rng=rng)
+        improved = scheduler.record(armIndex, numLeaves, time.process_time() - startSeconds)
+        attemptsUsed += 1
+        if profile is not None:
+            profile.count(f'pulls:{arm.name}')
+        if settings.validation == 'every' or (settings.validation == 'improvements' and numLeaves > bestLeaves):
+            assertValidTreeEdges(graph.vcount, edges, numLeaves, graph.edgeSet)
+
+        if numLeaves > bestLeaves:
+            bestEdges, bestLeaves, bestAttempt = edges, numLeaves, attempt
+        if improved:
+            lastImprovement = attempt
+
+        if targetLeaves is not None and scheduler.bestLeaves >= targetLeaves:
+            break
+        if settings.stagnation is not None and attempt - lastImprovement >= settings.stagnation:
+            break
+        if deadline is not None and time.time() >= deadline:
+            break
+    return (bestEdges, bestLeaves, bestAttempt, attemptsUsed, profile.summary() if profile is not None else None,
+            scheduler.summary())
+
+
+# run step(*args) as a phase of the graph's profile, if there is one
+def profiledStep(profile: SolverProfile, phase: str, step, *args):
+    if profile is None:
+        return step(*args)
+    profile.startPhase(phase)
+    result = step(*args)
+    profile.endPhase()
+    return result
+
+
+# the graph the attempts actually run on: the prepared kernel if kernelizing (see Kernelization), else the prepared input
+def workingGraph(graph: Graph, settings: SearchSettings):
+    kernel = Kernel(graph) if settings.kernelize else None
+    return kernel, prepare(kernel.graph if kernel is not None else graph)
+
+
+# improve the best multi-start tree with edge swaps if asked to, returning (edges, leaves, leaves gained)
+def polishResult(graph: PreparedGraph, settings: SearchSettings, graphNum: int, bestEdges, bestLeaves: int, upperBound: int):
+    if not settings.polish or bestEdges is None or bestLeaves >= upperBound:
+        return bestEdges, bestLeaves, 0
+    polishedEdges, polishedLeaves = improve(graph, bestEdges, settings.polishMoves, settings.polishTime,
+                                            random.Random(attemptSeed(settings.seed, graphNum, 'polish')))
+    assertValidTreeEdges(graph.vcount, polishedEdges, polishedLeaves, graph.edgeSet)
+    return polishedEdges, polishedLeaves, polishedLeaves - bestLeaves
+
+
+# try to improve the result and prove it optimal if asked to, returning (edges, leaves, upper bound, proven optimal)
+def exactResult(graph: PreparedGraph, settings: SearchSettings, bestEdges, bestLeaves: int, upperBound: int):
+    if not settings.exact or bestEdges is None or bestLeaves >= upperBound:
+        return bestEdges, bestLeaves, upperBound, bestLeaves >= upperBound
+    exactEdges, exactLeaves, provedOptimal, _ = ExactBranchAndBound.solve(graph, bestEdges, settings.exactTimeLimit)
+    assertValidTreeEdges(graph.vcount, exactEdges, exactLeaves, graph.edgeSet)
+    return exactEdges, exactLeaves, exactLeaves if provedOptimal else upperBound, provedOptimal
+
+
+# map the best result on the working graph back to the input graph, returning (edges, leaves, upper bound)
+def liftResult(kernel: Kernel, bestEdges, bestLeaves: int, upperBound: int):
+    if kernel is None:
+        return bestEdges, bestLeaves, upperBound
+    liftedEdges = kernel.liftEdges(bestEdges) if bestEdges is not None else None
+    return liftedEdges, bestLeaves + kernel.leafOffset, upperBound + kernel.leafOffset
+
+
+# the incumbent's first attempt and its leaves on the working graph (a kernel has leafOffset fewer leaves to find)
+def incumbentStart(kernel: Kernel, incumbent: Incumbent):
+    if incumbent is None:
+        return 0, -1
+    return incumbent.firstAttempt, incumbent.numLeaves - (kernel.leafOffset if kernel is not None else 0)
+
+
+# solve a whole graph in this process, returning (edges of the best tree, leaves, attempts used, seconds, upper bound,
+# leaves gained by polishing, whether the tree is proven optimal, profile summary or None, portfolio summary or None)
+def runGraph(graph: Graph, settings: SearchSettings, graphNum: int, incumbent: Incumbent = None):
+    startTime = time.time()
+    profile = SolverProfile() if settings.profile else None
+    kernel, preparedGraph = profiledStep(profile, 'prepare', workingGraph, graph, settings)
+    upperBound = upperBoundLeaves(preparedGraph)
+    deadline = startTime + settings.timeLimit if settings.timeLimit is not None else None
+    firstAttempt, incumbentLeaves = incumbentStart(kernel, incumbent)
+    portfolio = None
+    if settings.portfolio is not None:
+        bestEdges, bestLeaves, _, attemptsUsed, attemptsProfile, portfolio = runPortfolio(
+            preparedGraph, settings, graphNum, range(firstAttempt, settings.numAttempts), deadline, upperBound,
+            incumbentLeaves, firstAttempt - 1)
+    else:
+        bestEdges, bestLeaves, _, attemptsUsed, attemptsProfile = runAttempts(preparedGraph, settings, graphNum,
+                                                                               range(firstAttempt, settings.numAttempts),
+                                                                               deadline, upperBound, incumbentLeaves,
+                                                                               firstAttempt - 1)
+    if profile is not None:
+        profile.merge(attemptsProfile)
+    bestEdges, bestLeaves, upperBound, polishGain, provedOptimal = finishSearch(preparedGraph, kernel, settings, graphNum,
+                                                                                incumbent, bestEdges, bestLeaves,
+                                                                                upperBound, profile, portfolio)
+    return (bestEdges, bestLeaves, attemptsUsed, time.time() - startTime, upperBound, polishGain, provedOptimal,
+            profile.summary() if profile is not None else None, portfolio)
+
+
+'''
+Everything after the multi-start search of a graph, for both the serial search and the worker chunks: weigh the incumbent
+against the search's best tree, polish it, run the exact search and lift the result back from the kernel. Returns (edges,
+leaves, upper bound, leaves gained by polishing, whether the tree is proven optimal) on the input graph, and marks the
+portfolio summary (if any) when the incumbent is what is kept.
+'''
+def finishSearch(preparedGraph: PreparedGraph, kernel: Kernel, settings: SearchSettings, graphNum: int,
+                 incumbent: Incumbent, bestEdges, bestLeaves: int, upperBound: int, profile: SolverProfile = None,
+                 portfolio: dict = None):
+    # a cached tree is on the input numbering, so with a kernel it can only be compared once the result is lifted
+    if kernel is None:
+        bestEdges, bestLeaves = adoptIncumbent(bestEdges, bestLeaves, incumbent)
+    bestEdges, bestLeaves, polishGain = profiledStep(profile, 'polish', polishResult, preparedGraph, settings, graphNum,
+                                                     bestEdges, bestLeaves, upperBound)
+    bestEdges, bestLeaves, upperBound, provedOptimal = profiledStep(profile, 'exact', exactResult, preparedGraph, settings,
+                                                                    bestEdges, bestLeaves, upperBound)
+    bestEdges, bestLeaves, upperBound = liftResult(kernel, bestEdges, bestLeaves, upperBound)
+    if kernel is not None:
+        bestEdges, bestLeaves = adoptIncumbent(bestEdges, bestLeaves, incumbent)
+    if portfolio is not None and incumbent is not None and bestEdges is incumbent.edges:
+        portfolio['winner'] = 'incumbent'
+    return bestEdges, bestLeaves, upperBound, polishGain, provedOptimal
+
+
+# split range(start, stop) into at most numChunks interleaved ranges (start, start + numChunks, ...), so that chunks
+# running side by side move through the attempts in about the order a serial run would
+def chunkAttempts(start: int, stop: int, numChunks: int):
+    numChunks = max(1, min(numChunks, stop - start))
+    return [range(start + i, stop, numChunks) for i in range(numChunks)]
+
+
+class MultiStartRunner:
+
+    def __init__(self, settings: SearchSettings, numWorkers: int = 1, parallelism: str = 'attempts',
+                 cache: SolutionCache = None, profileHooks: list = None):
+        if parallelism not in ('attempts', 'graphs'):
+            raise Exception(f'Unknown parallelism "{parallelism}", expected "attempts" or "graphs"')
+        if settings.portfolio is not None and numWorkers > 1 and parallelism == 'attempts':
+            raise Exception('A portfolio runs the attempts of a graph one after another, '
+                            'so its workers need the "graphs" parallelism')
+        self.settings = settings
+        self.cache = cache
+        self.numWorkers = numWorkers
+        self.parallelism = parallelism
+        self.profileHooks = list(profileHooks) if profileHooks is not None else []
+        self.progress = SharedProgress() if numWorkers > 1 else None
+        self.executor = (ProcessPoolExecutor(max_workers=numWorkers, initializer=initWorker, initargs=(self.progress,))
+                         if numWorkers > 1 else None)
+
+
+    # solve every graph in order, yielding (graph, GraphResult) as each one finishes
+    # graphs is an iterable of (graph number, graph); the numbers pick the seeds, so skipped graphs keep the others aligned
+    def solveAll(self, graphs):
+        if self.executor is not None and self.parallelism == 'graphs':
+            graphs = list(graphs)
+            lookups = [self.lookup(graph, graphNum) for graphNum, graph in graphs]
+            futures = [self.executor.submit(runGraph, graph, self.settings, graphNum, incumbent)
+                       if cachedResult is None else None
+                       for (graphNum, graph), (key, incumbent, cachedResult) in zip(graphs, lookups)]
+            for (graphNum, graph), (key, incumbent, cachedResult), future in zip(graphs, lookups, futures):
+                if cachedResult is not None:
+                    yield graph, cachedResult
+                else:
+                    yield graph, self.remember(key, incumbent, finalResult(graph, graphNum, *future.result()))
+        else:
+            for graphNum, graph in graphs:
+                yield graph, self.solve(graph, graphNum)
+
+
+    '''
+    Look the graph up in the cache, returning (its key, the Incumbent for the search or None, the finished GraphResult if
+    the cached tree already covers the requested budget or None).
+    '''
+    def lookup(self, graph: Graph, graphNum: int):
+        if self.cache is None:
+            return None, None, None
+        startTime = time.time()
+        key = graphHash(graph)
+        entry = self.cache.lookup(key, graph.vcount())
+        if entry is None:
+            return key, None, None
+        settings = self.settings
+        # the attempts can only stand in for (or carry on) the requested ones if they are seeded the same way
+        sameSeeds = (entry.algorithm == algorithmName(settings) and entry.seed == settings.seed
+                     and entry.graphNum == graphNum)
+        if entry.provedOptimal or (sameSeeds and entry.attemptsSpent >= settings.numAttempts):
+            result = finalResult(graph, graphNum, entry.edges, entry.numLeaves, 0, time.time() - startTime,
+                                 entry.upperBound, 0, entry.provedOptimal)
+            result.fromCache = True
+            return key, None, result
+        return key, Incumbent(entry.edges, entry.numLeaves, entry.attemptsSpent if sameSeeds else 0), None
+
+
+    # replay the profile hooks over a freshly searched result, store it in the cache and hand it back
+    def remember(self, key: str, incumbent: Incumbent, result: GraphResult) -> GraphResult:
+        if result.profile is not None:
+            replay(result.profile, self.profileHooks)
+        if self.cache is not None:
+            firstAttempt = incumbent.firstAttempt if incumbent is not None else 0
+            self.cache.store(key, result.tree.vcount(),
+                             CacheEntry(result.tree.get_edgelist(), result.numLeaves, result.upperBound, result.provedOptimal,
+                                        algorithmName(self.settings),
+                                        {part: ALGORITHM_VERSIONS[part] for part in algorithmParts(self.settings)},
+                                        self.settings.seed, result.graphNum, firstAttempt + result.attemptsUsed))
+        return result
+
+
+    # run the attempts for a single graph within the budget and return its GraphResult
+    def solve(self, graph: Graph, graphNum: int) -> GraphResult:
+        key, incumbent, cachedResult = self.lookup(graph, graphNum)
+        if cachedResult is not None:
+            return cachedResult
+        settings = self.settings
+        if self.executor is None:
+            return self.remember(key, incumbent, finalResult(graph, graphNum, *runGraph(graph, settings, graphNum, incumbent)))
+
+        startTime = time.time()
+        profile = SolverProfile() if settings.profile else None
+        kernel, preparedGraph = profiledStep(profile, 'prepare', workingGraph, graph, settings)
+        upperBound = upperBoundLeaves(preparedGraph)
+        deadline = startTime + settings.timeLimit if settings.timeLimit is not None else None
+        firstAttempt, incumbentLeaves = incumbentStart(kernel, incumbent)
+        bestEdges, bestLeaves, bestAttempt = None, -1, -1
+        attemptsUsed = 0
+        # one chunk per worker, so each worker gets the graph once; the chunks stop each other through the shared progress
+        self.progress.reset(incumbentLeaves, firstAttempt - 1)
+        futures = [self.executor.submit(runWorkerAttempts, preparedGraph, settings, graphNum, chunk, deadline, upperBound)
+                   for chunk in chunkAttempts(firstAttempt, settings.numAttempts, self.numWorkers)]
+        for future in futures:
+            edges, numLeaves, attempt, chunkAttemptsUsed, chunkProfile = future.result()
+            attemptsUsed += chunkAttemptsUsed
+            if profile is not None:
+                profile.merge(chunkProfile)
+            if attempt is None:
+                continue  # stopped by another chunk before its first attempt
+            if numLeaves > bestLeaves or (numLeaves == bestLeaves and attempt < bestAttempt):
+                bestEdges, bestLeaves, bestAttempt = edges, numLeaves, attempt
+
+        bestEdges, bestLeaves, upperBound, polishGain, provedOptimal = finishSearch(preparedGraph, kernel, settings,
+                                                                                    graphNum, incumbent, bestEdges,
+                                                                                    bestLeaves, upperBound, profile)
+        return self.remember(key, incumbent, finalResult(graph, graphNum, bestEdges, bestLeaves, attemptsUsed,
+                                                         time.time() - startTime, upperBound, polishGain, provedOptimal,
+                                                         profile.summary() if profile is not None else None))
+
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
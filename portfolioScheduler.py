@@ -0,0 +1,120 @@
+from SolutionAlgorithms import DegreeOrderBFS
+from SolutionAlgorithms import ForestWithExpansionRules
+
+'''
+Portfolio of solver variants ("arms") and the bandit that hands out a graph's attempts between them.
+
+Each arm is a solver plus keyword arguments for its solve(), optionally followed by a short edge-swap polish of every tree
+it finds (polishMoves moves of LocalSearch.improve). The bandit works on leaf gains per CPU-second: a pull's gain is how
+many leaves its tree adds over the best tree of the graph so far (the first pull only sets that baseline), and its cost
+is the CPU time of the solve and the polish. Every arm is pulled once, and after that the arm with the highest
+    (leaves gained + PRIOR_GAIN) / CPU-seconds spent
+goes next (ties to the arm listed first). PRIOR_GAIN is the optimism that keeps every arm in play: an arm that stops
+gaining sees its index fall as its time grows, until the others have spent about as much, so arms end up with shares of
+the CPU time in proportion to their gains plus one. Deterministic arms are only pulled once, since another pull would give
+the same tree.
+
+Since the choices depend on measured times, a portfolio run (like a run with a time limit) depends on machine speed and
+load, not only on the seed. Each pull is still seeded by its attempt number, so a single attempt can be replayed.
+'''
+
+PRIOR_GAIN = 1.0
+ARM_POLISH_MOVES = 200
+MIN_PULL_SECONDS = 1e-6  # a pull too quick for the process clock still has to cost something
+
+
+class Arm:
+
+    def __init__(self, name: str, solver, solveArguments: dict = None, polishMoves: int = None, randomized: bool = True):
+        self.name = name
+        self.solver = solver
+        self.solveArguments = solveArguments if solveArguments is not None else {}
+        self.polishMoves = polishMoves  # edge-swap moves after every attempt, or None for no polish
+        self.randomized = randomized
+
+
+ARMS = {arm.name: arm for arm in [
+    Arm('forest', ForestWithExpansionRules),
+    Arm('forest:randomTies', ForestWithExpansionRules, {'randomTies': True}),
+    Arm('forest:root2', ForestWithExpansionRules, {'minRootDegree': 2}),
+    Arm('forest:root4', ForestWithExpansionRules, {'minRootDegree': 4}),
+    Arm('forest:rankedBranches', ForestWithExpansionRules, {'rankBranchExpansions': True}),
+    Arm('forest:rankedBranches:randomTies', ForestWithExpansionRules, {'rankBranchExpansions': True, 'randomTies': True}),
+    Arm('forest:polish', ForestWithExpansionRules, polishMoves=ARM_POLISH_MOVES),
+    Arm('forest:randomTies:polish', ForestWithExpansionRules, {'randomTies': True}, ARM_POLISH_MOVES),
+    Arm('bfs', DegreeOrderBFS, randomized=False),
+    Arm('bfs:randomTies', DegreeOrderBFS, {'randomTies': True}),
+]}
+
+# multiStartRunner.SOLVERS name of each solver module, for the cache versions of a portfolio run
+SOLVER_NAMES = {ForestWithExpansionRules: 'ForestWithExpansionRules', DegreeOrderBFS: 'DegreeOrderBFS'}
+
+
+class PortfolioScheduler:
+
+    def __init__(self, armNames: list, bestLeaves: int = -1):
+        self.arms = [ARMS[name] for name in armNames]
+        self.pulls = [0] * len(self.arms)
+        self.gains = [0] * len(self.arms)
+        self.seconds = [0.0] * len(self.arms)
+        self.bestLeaves = bestLeaves  # best of the graph so far, -1 until the first pull sets it
+        self.winner = None  # arm that found the current best tree
+
+
+    # index of the arm to pull next, or None when only spent deterministic arms are left
+    def chooseArm(self):
+        bestIndex, bestScore = None, -1.0
+        for index, arm in enumerate(self.arms):
+            if self.pulls[index] == 0:
+                return index
+            if not arm.randomized:
+                continue
+            score = (self.gains[index] + PRIOR_GAIN) / self.seconds[index]
+            if score > bestScore:
+                bestIndex, bestScore = index, score
+        return bestIndex
+
+
+    # book a pull of arm index that found a tree with numLeaves leaves in cpuSeconds, returning True if it is a new best
+    def record(self, index: int, numLeaves: int, cpuSeconds: float) -> bool:
+        self.pulls[index] += 1
+        self.seconds[index] += max(cpuSeconds, MIN_PULL_SECONDS)
+        if self.bestLeaves < 0:
+            self.bestLeaves, self.winner = numLeaves, self.arms[index].name
+            return True
+        if numLeaves <= self.bestLeaves:
+            return False
+        self.gains[index] += numLeaves - self.bestLeaves
+        self.bestLeaves, self.winner = numLeaves, self.arms[index].name
+        return True
+
+
+    # plain dictionaries, so the summary can be pickled back from a worker and merged into the run's totals
+    def summary(self) -> dict:
+        return {
+            'winner': self.winner,
+            'arms': {arm.name: {'pulls': self.pulls[index], 'gain': self.gains[index], 'seconds': self.seconds[index]}
+                     for index, arm in enumerate(self.arms)},
+        }
+
+
+# the solvers (by SOLVERS name) and whether polish is used by the given arms, for the cache versions of a portfolio run
+def armParts(armNames: list) -> list:
+    parts = sorted({SOLVER_NAMES[ARMS[name].solver] for name in armNames})
+    if any(ARMS[name].polishMoves is not None for name in armNames):
+        parts.append('polish')
+    return parts
+
+
+# totals over the summaries of many graphs: per arm the graphs it won, its pulls, its leaf gains and its CPU-seconds
+def mergeSummaries(summaries) -> dict:
+    totals = {}
+    for summary in summaries:
+        for name, stats in summary['arms'].items():
+            total = totals.setdefault(name, {'wins': 0, 'pulls': 0, 'gain': 0, 'seconds': 0.0})
+            total['pulls'] += stats['pulls']
+            total['gain'] += stats['gain']
+            total['seconds'] += stats['seconds']
+        if summary['winner'] in totals:
+            totals[summary['winner']]['wins'] += 1
+    return totals
@@ -0,0 +1,159 @@
+import argparse
+import hashlib
+import json
+import os
+import igraph
+
+'''
+Persistent cache of the best tree found for each input graph, so repeated runs over the same instances can pick up where
+the last run stopped instead of starting every graph from zero.
+
+Entries are keyed by a SHA-256 of the graph in its canonical text form, i.e. exactly what graphGenerator.outputGraphToFile
+writes for it (the "n m" header, then every edge once as "u v" with u < v, in sorted order), so the key only depends on the
+vertex numbering and the edge set, not on the order the edges were read in. Each entry is one JSON file in the cache directory
+holding the tree's edges, its leaf count, the upper bound it was compared against, the algorithm that found it (the solver
+plus the kernelize/polish/exact steps, see multiStartRunner.algorithmName), the versions of those parts, the base seed and
+graph number its attempts were seeded with, and the attempts spent on it. An instance file that repeats a graph shares
+one entry between the copies.
+
+Invalidation: the versions stored with an entry are compared against the current ones on every lookup, and an entry that
+used a part whose version has since been bumped is deleted instead of returned. Entries can also be dropped by hand with
+`python solutionCache.py clear <directory> [--algorithm <part>]`.
+
+Eviction: the cache keeps its total size under maxBytes by deleting the least recently used entries (a hit touches the
+entry's file, so the modification time is the last use).
+'''
+
+ENTRY_FORMAT = 1
+
+
+# hash of the graph as graphGenerator.outputGraphToFile would write it
+def graphHash(graph: igraph.Graph) -> str:
+    edges = sorted((min(edge), max(edge)) for edge in graph.get_edgelist())
+    text = f'{graph.vcount()} {graph.ecount()}\n' + ''.join(f'{source} {target}\n' for source, target in edges)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class CacheEntry:
+
+    def __init__(self, edges, numLeaves: int, upperBound: int, provedOptimal: bool, algorithm: str, versions: dict,
+                 seed: int, graphNum: int, attemptsSpent: int):
+        self.edges = edges
+        self.numLeaves = numLeaves
+        self.upperBound = upperBound
+        self.provedOptimal = provedOptimal
+        self.algorithm = algorithm
+        self.versions = versions  # version of every part of the algorithm when the entry was stored
+        self.seed = seed
+        self.graphNum = graphNum  # with the seed, picks the attempt seeds (see multiStartRunner.attemptSeed)
+        self.attemptsSpent = attemptsSpent
+
+
+class SolutionCache:
+
+    def __init__(self, directory: str, maxBytes: int, versions: dict):
+        self.directory = directory
+        self.maxBytes = maxBytes
+        self.versions = versions
+        os.makedirs(directory, exist_ok=True)
+        self.totalBytes = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.name.endswith('.json'))
+
+
+    def entryFilename(self, key: str) -> str:
+        return os.path.join(self.directory, key + '.json')
+
+
+    # the entry stored for the graph with this key, or None if there is none or it is stale
+    def lookup(self, key: str, numVertices: int) -> CacheEntry:
+        filename = self.entryFilename(key)
+        if not os.path.isfile(filename):
+            return None
+        with open(filename, 'r') as file:
+            fields = json.load(file)
+        if (fields['format'] != ENTRY_FORMAT or fields['numVertices'] != numVertices
+                or any(self.versions.get(part) != version for part, version in fields['versions'].items())):
+            self.remove(filename)
+            return None
+        os.utime(filename)
+        return CacheEntry([tuple(edge) for edge in fields['edges']], fields['numLeaves'], fields['upperBound'],
+                          fields['provedOptimal'], fields['algorithm'], fields['versions'], fields['seed'],
+                          fields['graphNum'], fields['attemptsSpent'])
+
+
+    # store the entry unless the cache already has a tree with more leaves for this graph
+    def store(self, key: str, numVertices: int, entry: CacheEntry):
+        existing = self.lookup(key, numVertices)
+        if existing is not None and existing.numLeaves > entry.numLeaves:
+            return
+        fields = {
+            'format': ENTRY_FORMAT,
+            'numVertices': numVertices,
+            'numLeaves': entry.numLeaves,
+            'upperBound': entry.upperBound,
+            'provedOptimal': entry.provedOptimal,
+            'algorithm': entry.algorithm,
+            'versions': entry.versions,
+            'seed': entry.seed,
+            'graphNum': entry.graphNum,
+            'attemptsSpent': entry.attemptsSpent,
+            'edges': [list(edge) for edge in entry.edges],
+        }
+        filename = self.entryFilename(key)
+        if os.path.isfile(filename):
+            self.totalBytes -= os.path.getsize(filename)
+        with open(filename + '.tmp', 'w') as file:
+            json.dump(fields, file, separators=(',', ':'))
+        os.replace(filename + '.tmp', filename)
+        self.totalBytes += os.path.getsize(filename)
+        self.evict(keep=filename)
+
+
+    # delete least recently used entries until the cache fits in maxBytes
+    def evict(self, keep: str = None):
+        if self.totalBytes <= self.maxBytes:
+            return
+        entries = sorted((entry.stat().st_mtime, entry.path) for entry in os.scandir(self.directory)
+                         if entry.name.endswith('.json') and entry.path != keep)
+        for _, filename in entries:
+            if self.totalBytes <= self.maxBytes:
+                break
+            self.remove(filename)
+
+
+    def remove(self, filename: str):
+        self.totalBytes -= os.path.getsize(filename)
+        os.remove(filename)
+
+
+    # delete every entry, or only the entries that used the given solver or step, returning how many were deleted
+    def clear(self, algorithmPart: str = None) -> int:
+        numRemoved = 0
+        for entry in list(os.scandir(self.directory)):
+            if not entry.name.endswith('.json'):
+                continue
+            if algorithmPart is not None:
+                with open(entry.path, 'r') as file:
+                    if algorithmPart not in json.load(file)['versions']:
+                        continue
+            self.remove(entry.path)
+            numRemoved += 1
+        return numRemoved
+
+
+def main():
+    argParser = argparse.ArgumentParser(description='Manage a solution cache directory.')
+    argParser.add_argument('command', choices=['clear', 'stats'])
+    argParser.add_argument('directory')
+    argParser.add_argument('--algorithm', default=None,
+                           help='only clear entries found with this solver or step (e.g. DegreeOrderBFS, polish)')
+    args = argParser.parse_args()
+    cache = SolutionCache(args.directory, float('inf'), {})
+    if args.command == 'clear':
+        print(f'removed {cache.clear(args.algorithm)} entries')
+    else:
+        numEntries = len([entry for entry in os.scandir(args.directory) if entry.name.endswith('.json')])
+        print(f'{numEntries} entries, {cache.totalBytes} bytes')
+
+
+if __name__ == '__main__':
+    main()
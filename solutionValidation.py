@@ -0,0 +1,71 @@
+import igraph
+from SolutionAlgorithms.DisjointSet import DisjointSet
+
+
+def assertValidInputGraph(graph: igraph.Graph):
+    assert graph.is_connected()
+    assert graph.vcount() <= 100
+    assert graph.ecount() <= 2000
+    
+    # check that the graph doesn't contain duplicate or self edges
+    adjacencyList = {}
+    for edge in graph.es:
+        assert edge.source != edge.target
+        if edge.source < edge.target:
+            if edge.source not in adjacencyList.keys():
+                adjacencyList[edge.source] = set()
+            assert edge.target not in adjacencyList[edge.source]
+            adjacencyList[edge.source].add(edge.target)
+        else:
+            if edge.target not in adjacencyList.keys():
+                adjacencyList[edge.target] = set()
+            assert edge.source not in adjacencyList[edge.target]
+            adjacencyList[edge.target].add(edge.source)
+
+
+def assertValidSolution(originalGraph: igraph.Graph, solutionTree: igraph.Graph, numLeaves):
+    assert solutionTree.is_connected()
+    
+    # assert correct number of edges to be a tree
+    assert solutionTree.ecount() == solutionTree.vcount() - 1
+
+    # assert that all vertices are included and no other ones are added
+    vertexSet = set()
+    for edge in solutionTree.to_tuple_list():
+        vertexSet.add(edge[0])
+        vertexSet.add(edge[1])
+    numberSet = set(range(originalGraph.vcount()))
+    verticesNotIncluded = numberSet.difference(vertexSet)
+    assert len(verticesNotIncluded) == 0, f'Solution did not contain vertices {verticesNotIncluded}'
+    extraVertices = vertexSet.difference(numberSet)
+    assert len(extraVertices) == 0, f'Solution was not supposed to contain vertices {extraVertices}'
+
+    # assert number of leaves is correct
+    realLeaves = len([indegree for indegree in solutionTree.indegree() if indegree == 1])
+    assert numLeaves == realLeaves, f'Solution was supposed to contain {numLeaves} leaves, but instead contained {realLeaves} leaves'
+
+
+'''
+Lightweight check of a solution given as a list of (u, v) edges on the vertices 0 to numVertices - 1, for use inside the
+attempt loop. It is O(n) (plus the union-find's inverse Ackermann factor) and never touches igraph:
+    - there are exactly numVertices - 1 edges, every endpoint is a real vertex, and no edge closes a cycle, which
+      together mean the edges form a spanning tree
+    - if graphEdges (a set of (min, max) pairs of the input graph) is given, every tree edge is an edge of the input
+    - the number of degree-1 vertices is numLeaves
+'''
+def assertValidTreeEdges(numVertices: int, treeEdges, numLeaves, graphEdges: set = None):
+    assert len(treeEdges) == max(numVertices - 1, 0), f'Solution has {len(treeEdges)} edges for {numVertices} vertices'
+
+    components = DisjointSet(numVertices)
+    degrees = [0] * numVertices
+    for source, target in treeEdges:
+        assert 0 <= source < numVertices and 0 <= target < numVertices, f'Solution edge {(source, target)} is out of range'
+        assert components.union(source, target), f'Solution edge {(source, target)} closes a cycle'
+        if graphEdges is not None:
+            assert (min(source, target), max(source, target)) in graphEdges, f'Solution edge {(source, target)} is not in the graph'
+        degrees[source] += 1
+        degrees[target] += 1
+
+    realLeaves = degrees.count(1)
+    assert numLeaves == realLeaves, f'Solution was supposed to contain {numLeaves} leaves, but instead contained {realLeaves} leaves'
+
@@ -0,0 +1,213 @@
+import json
+import os
+import igraph
+import binaryFormat
+from array import array
+
+'''
+Writer for the solution file (text like all-hard.out, or the binary format) and its _summary.txt.
+
+It keeps both files open with large buffers and only flushes every checkpointEvery graphs. After each flush it rewrites
+a manifest next to the output (<output>.manifest.json, replaced atomically) that records the input file, how many graphs
+are complete with their leaf counts, and how long the output and summary files were at that point. Graphs are written in
+order, so the finished graphs are always a prefix of the input.
+
+With resume, an existing output is picked up from its manifest: anything written after the last checkpoint is cut off
+and finished() tells the caller which graphs to skip. An existing output without a manifest is refused rather than
+appended to, and a writer that is not resuming starts its files out empty. With improveFinished as well, the finished
+graphs are solved again and the stored tree is only replaced when the new one has more leaves; that pass writes to
+<output>.improving and replaces the output when it closes, so an interrupted improvement run leaves the original output
+untouched.
+
+Trees can also be handed over as flat edge arrays (writeEdges), which is how the large-graph mode streams its result:
+text is written out in chunks of TEXT_CHUNK_EDGES edges, and binary records are flushed early once more than
+PENDING_EDGE_LIMIT edges are waiting, so a huge tree is never held as Python tuples or one big string.
+'''
+
+TEXT_CHUNK_EDGES = 1 << 16
+PENDING_EDGE_LIMIT = 1 << 20
+
+class SolutionWriter:
+
+    def __init__(self, filename: str, inputFilename: str, binary: bool = False, checkpointEvery: int = 10,
+                 resume: bool = False, improveFinished: bool = False):
+        self.filename = filename
+        self.manifestFilename = filename + '.manifest.json'
+        self.inputFilename = inputFilename
+        self.binary = binary
+        self.checkpointEvery = checkpointEvery
+        self.storedBest = {}  # graph number -> (leaves, edges) of the stored tree, only used with improveFinished
+        self.completedLeaves = []
+
+        if resume and os.path.isfile(self.manifestFilename):
+            self.completedLeaves = self.restoreCheckpoint()
+        elif resume and (os.path.isfile(filename) or os.path.isfile(filename + '_summary.txt')):
+            # without a manifest there is no telling how much of the file is complete, so it is left alone
+            raise Exception(f'{filename} has no manifest ({self.manifestFilename}) to resume from')
+        self.numFinished = len(self.completedLeaves)
+        self.improveFinished = improveFinished and self.numFinished > 0
+        if self.improveFinished:
+            self.storedBest = self.readStoredSolutions()
+            self.completedLeaves = []
+            self.writeFilename = filename + '.improving'
+            for leftover in (self.writeFilename, self.writeFilename + '_summary.txt'):
+                if os.path.isfile(leftover):
+                    os.remove(leftover)
+        else:
+            self.writeFilename = filename
+
+        # only a resumed output keeps what is already in the file; anything else starts out empty
+        mode = 'a' if self.numFinished > 0 and not self.improveFinished else 'w'
+        if binary and mode == 'w' and os.path.isfile(self.writeFilename):
+            os.remove(self.writeFilename)
+        self.output = None if binary else open(self.writeFilename, mode, buffering=1 << 20)
+        self.summary = open(self.writeFilename + '_summary.txt', mode, buffering=1 << 16)
+        self.pendingBinary = []  # (numVertices, edges, numLeaves) waiting for the next checkpoint
+        self.pendingEdges = 0
+        self.pendingGraphs = 0
+
+
+    # whether graph k is already done and should be skipped
+    def finished(self, k: int) -> bool:
+        return k < self.numFinished and not self.improveFinished
+
+
+    def nextGraph(self) -> int:
+        return len(self.completedLeaves)
+
+
+    # write the solution for the next graph in order, returning the leaves of the tree that was stored
+    def write(self, graphNum: int, tree: igraph.Graph, numLeaves: int) -> int:
+        return self.writeEdges(graphNum, tree.vcount(), lexigraphicalEdgeOrder(tree), numLeaves)
+
+
+    # the same for a tree given by its edges in lexigraphical order, as (u, v) pairs or flat in an array
+    def writeEdges(self, graphNum: int, numVertices: int, edges, numLeaves: int) -> int:
+        if graphNum != self.nextGraph():
+            raise Exception(f'Solutions must be written in order: expected graph {self.nextGraph()}, got graph {graphNum}')
+        if graphNum in self.storedBest and self.storedBest[graphNum][0] >= numLeaves:
+            numLeaves, edges = self.storedBest[graphNum]
+
+        if self.binary:
+            self.pendingBinary.append((numVertices, edges, numLeaves))
+            self.pendingEdges += numVertices - 1
+        else:
+            writeTextSolution(self.output, edges, numLeaves)
+        self.summary.write(f'{numLeaves}\n')
+        self.completedLeaves.append(numLeaves)
+        self.pendingGraphs += 1
+        if self.pendingGraphs >= self.checkpointEvery or self.pendingEdges > PENDING_EDGE_LIMIT:
+            self.checkpoint()
+        return numLeaves
+
+
+    # flush everything written so far to disk and record it in the manifest
+    def checkpoint(self):
+        if self.binary:
+            if self.pendingBinary:
+                binaryFormat.appendGraphs(self.writeFilename, binaryFormat.SOLUTIONS, self.pendingBinary)
+            self.pendingBinary = []
+            self.pendingEdges = 0
+            outputBytes = os.path.getsize(self.writeFilename) if os.path.isfile(self.writeFilename) else 0
+        else:
+            self.output.flush()
+            os.fsync(self.output.fileno())
+            outputBytes = self.output.tell()
+        self.summary.flush()
+        os.fsync(self.summary.fileno())
+        self.pendingGraphs = 0
+
+        manifest = {
+            'input': os.path.abspath(self.inputFilename),
+            'inputBytes': os.path.getsize(self.inputFilename),
+            'format': 'binary' if self.binary else 'text',
+            'completedGraphs': len(self.completedLeaves),
+            'leaves': self.completedLeaves,
+            'outputBytes': outputBytes,
+            'summaryBytes': self.summary.tell(),
+        }
+        manifestFilename = self.writeFilename + '.manifest.json'
+        with open(manifestFilename + '.tmp', 'w') as file:
+            json.dump(manifest, file)
+        os.replace(manifestFilename + '.tmp', manifestFilename)
+
+
+    def close(self):
+        self.checkpoint()
+        if self.output is not None:
+            self.output.close()
+        self.summary.close()
+        if self.writeFilename != self.filename:
+            os.replace(self.writeFilename, self.filename)
+            os.replace(self.writeFilename + '_summary.txt', self.filename + '_summary.txt')
+            os.replace(self.writeFilename + '.manifest.json', self.manifestFilename)
+
+
+    # cut the output back to its last checkpoint, returning the leaf counts of the graphs finished by then
+    def restoreCheckpoint(self):
+        with open(self.manifestFilename, 'r') as file:
+            manifest = json.load(file)
+        if manifest['input'] != os.path.abspath(self.inputFilename) or manifest['inputBytes'] != os.path.getsize(self.inputFilename):
+            raise Exception(f'{self.filename} was written for {manifest["input"]}, not {self.inputFilename}')
+        if manifest['format'] != ('binary' if self.binary else 'text'):
+            raise Exception(f'{self.filename} is in the {manifest["format"]} format')
+
+        if self.binary:
+            if manifest['completedGraphs'] > 0:
+                binaryFormat.truncateGraphs(self.filename, manifest['completedGraphs'])
+            elif os.path.isfile(self.filename):
+                os.remove(self.filename)
+        else:
+            with open(self.filename, 'a') as file:
+                file.truncate(manifest['outputBytes'])
+        with open(self.filename + '_summary.txt', 'a') as file:
+            file.truncate(manifest['summaryBytes'])
+        return manifest['leaves']
+
+
+    def readStoredSolutions(self):
+        if self.binary:
+            binaryFile = binaryFormat.BinaryGraphFile(self.filename)
+            stored = {}
+            for k in range(len(binaryFile)):
+                flatEdges = binaryFile.readFlatEdges(k)
+                stored[k] = (binaryFile.graphInfo(k)[2], list(zip(flatEdges[0::2], flatEdges[1::2])))
+            binaryFile.close()
+            return stored
+        return {k: (numLeaves, edges) for k, (_, edges, numLeaves) in enumerate(binaryFormat.readTextSolutions(self.filename))}
+
+
+def writeTextSolution(file, edges, numLeaves):
+    if not isinstance(edges, array):
+        file.write(formatTextSolution(edges, numLeaves))
+        return
+    file.write(f'{numLeaves} {len(edges) // 2}\n')
+    for start in range(0, len(edges), 2 * TEXT_CHUNK_EDGES):
+        chunk = edges[start:start + 2 * TEXT_CHUNK_EDGES]
+        file.write(''.join(f'{source} {target}\n' for source, target in zip(chunk[0::2], chunk[1::2])))
+
+
+def formatTextSolution(edges, numLeaves) -> str:
+    return f'{numLeaves} {len(edges)}\n' + ''.join(f'{edge[0]} {edge[1]}\n' for edge in edges)
+
+
+def lexigraphicalEdgeOrder(graph: igraph.Graph):
+    adjacency_list = {}
+    for edge in graph.es:
+        source = int(graph.vs[edge.source]["name"])
+        target = int(graph.vs[edge.target]["name"])
+        if source < target:
+            a = source
+            b = target
+        else:
+            b = source
+            a = target
+        if a not in adjacency_list.keys():
+            adjacency_list[a] = []
+        adjacency_list[a].append(b)
+    
+    edges = []
+    for node in sorted(adjacency_list.keys()):
+        for neighbor in sorted(adjacency_list[node]):
+            edges.append((node, neighbor))
+    return edges     